@@ -0,0 +1,274 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import cv2
+import numpy as np
+import torch
+import ultralytics
+import utils
+
+MODELS = ["yolov8n.pt", "yolov8s.pt", "yolov8m.pt", "yolov8l.pt", "yolov8x.pt"]
+RESOLUTIONS = ["640x480", "1280x720", "1920x1080"]
+
+def parse_resolution(text):
+    """Parse a WIDTHxHEIGHT string"""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def synthetic_frame(rng, width, height):
+    """Generate a frame with a gradient background, random shapes and sensor-like noise"""
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)
+    frame = np.stack([
+        np.add.outer(y, x) / 2,
+        np.broadcast_to(x, (height, width)),
+        np.broadcast_to(y[:, None], (height, width))
+    ], axis=2).astype(np.uint8)
+
+    for _ in range(rng.integers(5, 15)):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        x1, y1 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size = int(rng.integers(min(width, height) // 20, min(width, height) // 4))
+        if rng.random() < 0.5:
+            cv2.rectangle(frame, (x1, y1), (x1 + size, y1 + size), color, -1)
+        else:
+            cv2.circle(frame, (x1, y1), size // 2, color, -1)
+
+    noise = rng.integers(-8, 9, frame.shape, dtype=np.int16)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+def generate_images(folder, width, height, count, seed=0):
+    """Write a deterministic set of synthetic JPEG images"""
+    folder.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        cv2.imwrite(str(folder / f"synthetic_{i:04d}.jpg"), synthetic_frame(rng, width, height))
+    return sorted(folder.glob("*.jpg"))
+
+def generate_video(path, width, height, frames, fps=30, seed=0):
+    """Write a deterministic synthetic video with shapes drifting across the frame"""
+    rng = np.random.default_rng(seed)
+    base = synthetic_frame(rng, width, height)
+    out = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    for i in range(frames):
+        out.write(np.roll(base, shift=i * 4, axis=1))
+    out.release()
+    return path
+
+def latency_summary(durations):
+    """Summarise per-frame durations in milliseconds"""
+    if not durations:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None}
+    values = np.asarray(durations) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'mean_ms': round(float(values.mean()), 3)
+    }
+
+def benchmark_images(model, image_files, output_dir, batch_size):
+    """Run a set of images through the image processing path and time every call"""
+    latencies = []
+    start = time.perf_counter()
+    for i in range(0, len(image_files), batch_size):
+        batch = image_files[i:i + batch_size]
+        call_start = time.perf_counter()
+        if batch_size > 1:
+            utils.process_images_batch(model, batch, output_dir, verbose=False)
+        else:
+            utils.process_image(model, batch[0], output_dir, verbose=False)
+        # Every image in a batch waits for the whole batch
+        latencies.extend([time.perf_counter() - call_start] * len(batch))
+    elapsed = time.perf_counter() - start
+    return {
+        'images_per_s': round(len(image_files) / elapsed, 3),
+        'latency': latency_summary(latencies)
+    }
+
+def benchmark_video(model, video_path, output_dir, pipelined):
+    """Run a video through process_video and collect its per-frame timings"""
+    stats = utils.process_video(model, video_path, output_dir, progress_bar=False, pipelined=pipelined)
+    if stats is None:
+        return None
+    return {
+        'fps': round(stats['fps'], 3),
+        'latency': latency_summary(stats['frame_times'])
+    }
+
+def benchmark_server(url, images, concurrency, requests):
+    """Send requests from concurrent clients to a running detection server and time each one"""
+    def send(i):
+        request = urllib.request.Request(f"{url.rstrip('/')}/detect", data=images[i % len(images)],
+                                         headers={"Content-Type": "application/octet-stream"})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            batch_size = json.load(response)['batch_size']
+        return time.perf_counter() - start, batch_size
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        measured = list(pool.map(send, range(requests)))
+    elapsed = time.perf_counter() - start
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'requests_per_s': round(requests / elapsed, 3),
+        'mean_batch_size': round(float(np.mean([batch_size for _, batch_size in measured])), 3),
+        'latency': latency_summary([latency for latency, _ in measured])
+    }
+
+def run_metadata(device):
+    """Describe the code version and machine a benchmark ran on"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec="seconds"),
+        'device': device,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'torch': torch.__version__,
+        'opencv': cv2.__version__,
+        'ultralytics': ultralytics.__version__
+    }
+
+def result_key(result):
+    """Identify a benchmark case independently of its measurements"""
+    return (result['model'], result['input'], result['resolution'],
+            result.get('batch_size'), result.get('pipelined'))
+
+def compare(results, baseline_path):
+    """Print the throughput change of each case against a previous benchmark file"""
+    with open(baseline_path) as f:
+        baseline = {result_key(result): result for result in json.load(f)['results']}
+
+    print(f"\nComparison against {baseline_path}:")
+    for result in results:
+        previous = baseline.get(result_key(result))
+        metric = {'images': 'images_per_s', 'video': 'fps', 'server': 'requests_per_s'}[result['input']]
+        if previous is None or not previous.get(metric):
+            continue
+        change = (result[metric] / previous[metric] - 1) * 100
+        print(f"  - {' '.join(str(part) for part in result_key(result) if part is not None)}: "
+              f"{previous[metric]:.2f} -> {result[metric]:.2f} ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the YOLOv8 detection pipeline on synthetic inputs")
+    parser.add_argument("--models", nargs="+", default=MODELS,
+                       help="Models to benchmark (default: all YOLOv8 sizes)")
+    parser.add_argument("--resolutions", nargs="+", default=RESOLUTIONS,
+                       help="Input resolutions as WIDTHxHEIGHT (default: 640x480 1280x720 1920x1080)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8],
+                       help="Image batch sizes to benchmark (default: 1 4 8)")
+    parser.add_argument("--images", type=int, default=32,
+                       help="Number of synthetic images per resolution (default: 32)")
+    parser.add_argument("--video-frames", type=int, default=120,
+                       help="Number of frames in each synthetic video, 0 skips videos (default: 120)")
+    parser.add_argument("--warmup", type=int, default=3,
+                       help="Warm-up model calls before timing each model (default: 3)")
+    parser.add_argument("--output", type=str,
+                       help="Path of the JSON report (default: output_results/benchmark_YYYYMMDD_HHMMSS.json)")
+    parser.add_argument("--compare", type=str,
+                       help="Previous benchmark JSON to compare throughput against")
+    parser.add_argument("--server-url", type=str,
+                       help="Load test a running detect.py --serve server instead of benchmarking models")
+    parser.add_argument("--concurrency", type=int, default=8,
+                       help="Concurrent clients when load testing a server (default: 8)")
+    parser.add_argument("--requests", type=int, default=200,
+                       help="Total requests sent when load testing a server (default: 200)")
+    args = parser.parse_args()
+
+    device = utils.get_device()
+    utils.print_device_info(device)
+    resolutions = [parse_resolution(text) for text in args.resolutions]
+    results = []
+
+    if args.server_url:
+        # Encode synthetic images in memory and send them as request bodies
+        rng = np.random.default_rng(0)
+        width, height = resolutions[0]
+        images = [cv2.imencode(".jpg", synthetic_frame(rng, width, height))[1].tobytes()
+                  for _ in range(min(args.images, args.requests))]
+        print(f"Load testing {args.server_url} with {args.concurrency} clients...")
+        measured = benchmark_server(args.server_url, images, args.concurrency, args.requests)
+        results.append({'model': 'server', 'input': 'server', 'resolution': args.resolutions[0],
+                        'batch_size': args.concurrency, **measured})
+        print(f"  - {measured['requests_per_s']:.2f} requests/s, mean batch {measured['mean_batch_size']}, "
+              f"p50 {measured['latency']['p50_ms']} ms, p95 {measured['latency']['p95_ms']} ms, "
+              f"p99 {measured['latency']['p99_ms']} ms")
+
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            output_dir = tmp / "output"
+            output_dir.mkdir()
+
+            # Generate the same synthetic inputs for every model
+            print("Generating synthetic inputs...")
+            inputs = {}
+            for width, height in resolutions:
+                name = f"{width}x{height}"
+                image_files = generate_images(tmp / name, width, height, args.images)
+                video_path = None
+                if args.video_frames > 0:
+                    video_path = generate_video(tmp / f"{name}.mp4", width, height, args.video_frames)
+                inputs[name] = (image_files, video_path)
+
+            for model_name in args.models:
+                print(f"\nBenchmarking model: {model_name}")
+                model = utils.load_model(model_name, device)
+
+                # Warm up so one-off initialisation is not timed
+                warmup_image = cv2.imread(str(inputs[args.resolutions[0]][0][0]))
+                for _ in range(args.warmup):
+                    model(warmup_image, verbose=False)
+
+                for name, (image_files, video_path) in inputs.items():
+                    for batch_size in args.batch_sizes:
+                        measured = benchmark_images(model, image_files, output_dir, batch_size)
+                        results.append({'model': model_name, 'input': 'images', 'resolution': name,
+                                        'batch_size': batch_size, **measured})
+                        print(f"  - images {name} batch {batch_size}: {measured['images_per_s']:.2f} images/s, "
+                              f"p50 {measured['latency']['p50_ms']} ms")
+
+                    if video_path is None:
+                        continue
+                    for pipelined in (False, True):
+                        measured = benchmark_video(model, video_path, output_dir, pipelined)
+                        if measured is None:
+                            continue
+                        results.append({'model': model_name, 'input': 'video', 'resolution': name,
+                                        'pipelined': pipelined, **measured})
+                        print(f"  - video {name} {'pipelined' if pipelined else 'sequential'}: "
+                              f"{measured['fps']:.2f} FPS, p50 {measured['latency']['p50_ms']} ms")
+
+    report = {'meta': run_metadata(device), 'results': results}
+    if args.output:
+        output_path = Path(args.output)
+    else:
+        output_path = Path("output_results") / f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nBenchmark report saved to: {output_path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
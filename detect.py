@@ -1,7 +1,8 @@
 import argparse
+import signal
 import time
+from contextlib import nullcontext
 from pathlib import Path
-from ultralytics import YOLO
 import utils
 import torch
 from tqdm import tqdm
@@ -11,65 +12,385 @@ def main():
     parser.add_argument("--image", type=str, help="Path to a single image")
     parser.add_argument("--folder", type=str, help="Path to a folder containing images")
     parser.add_argument("--video", type=str, help="Path to a video file")
+    parser.add_argument("--streams", nargs="+", metavar="SOURCE",
+                       help="Process several video files, stream URLs or camera indices at once with one shared model")
+    parser.add_argument("--recursive", action="store_true",
+                       help="Also process images in subfolders of --folder, mirroring them in the output")
+    parser.add_argument("--include", nargs="+",
+                       help="Only process folder images whose relative path matches one of these glob patterns")
+    parser.add_argument("--exclude", nargs="+",
+                       help="Skip folder images and subfolders whose relative path matches one of these glob patterns")
+    parser.add_argument("--resume", type=str, metavar="RUN_DIR",
+                       help="Continue an interrupted --folder or --video run in its output directory, skipping finished work")
+    parser.add_argument("--segment-seconds", type=float,
+                       help="Checkpoint --video runs every this many seconds of video so --resume can continue mid-video; also the chunk length with --workers")
+    parser.add_argument("--watch", type=str, help="Path to a folder to watch for new images and videos")
     parser.add_argument("--model", type=str, default="yolov8m.pt", 
                        choices=["yolov8n.pt", "yolov8s.pt", "yolov8m.pt", "yolov8l.pt", "yolov8x.pt"],
                        help="YOLOv8 model to use (default: yolov8m.pt)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                       help="Number of images per model call when processing a folder, or frames across all --streams (default: 1, one per stream)")
+    parser.add_argument("--pipeline", action="store_true",
+                       help="Run video decoding, inference and encoding as parallel stages")
+    parser.add_argument("--max-per-class", type=int, default=1,
+                       help="Detections kept per class, 0 keeps all boxes (default: 1)")
+    parser.add_argument("--detect-every", type=int, default=1,
+                       help="Run the detector on every Nth video frame and track boxes in between (default: 1)")
+    parser.add_argument("--motion-threshold", type=float,
+                       help="Only run the detector on video frames where more than this percent of pixels changed (e.g. 0.5)")
+    parser.add_argument("--tile-size", type=int,
+                       help="Detect images on overlapping tiles of this many pixels to find small objects in very large images")
+    parser.add_argument("--tile-overlap", type=float, default=0.2,
+                       help="Fraction of each tile that overlaps its neighbours (default: 0.2)")
+    parser.add_argument("--prefetch", type=int, default=8,
+                       help="Images decoded ahead of inference on background threads, 0 disables (default: 8)")
+    parser.add_argument("--reduced-decode", action="store_true",
+                       help="Decode images much larger than the model input at 1/2, 1/4 or 1/8 resolution")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Number of worker processes for folder or video processing, each with its own model (default: 1)")
+    parser.add_argument("--threads", type=int,
+                       help="PyTorch threads per process (default: physical cores divided by --workers)")
+    parser.add_argument("--pin-cpus", action="store_true",
+                       help="Pin each process to its own physical cores (Linux only)")
+    parser.add_argument("--video-writer", type=str, default="opencv", choices=utils.WRITER_BACKENDS,
+                       help="Video encoder for annotated videos: OpenCV's mp4v or an ffmpeg pipe (default: opencv)")
+    parser.add_argument("--video-codec", type=str, default="libx264",
+                       help="ffmpeg codec for --video-writer ffmpeg, e.g. libx264, libx265, h264_nvenc (default: libx264)")
+    parser.add_argument("--video-preset", type=str, default="veryfast",
+                       help="ffmpeg encoder preset for --video-writer ffmpeg (default: veryfast)")
+    parser.add_argument("--video-crf", type=int, default=23,
+                       help="ffmpeg quality for --video-writer ffmpeg, lower is better (default: 23)")
+    parser.add_argument("--encode-threads", type=int,
+                       help="ffmpeg encoder threads per video (default: the OpenCV thread budget per process)")
+    parser.add_argument("--cache-dir", type=str,
+                       help="Directory of a persistent detection cache used to skip previously processed images")
+    parser.add_argument("--cache-size-mb", type=int, default=1024,
+                       help="Maximum size of the detection cache before old entries are evicted (default: 1024)")
+    parser.add_argument("--save-detections", choices=utils.DETECTION_FORMATS,
+                       help="Also write detection records to detections.jsonl or detections.npz in the output directory")
+    parser.add_argument("--no-render", action="store_true",
+                       help="Skip drawing and saving annotated images/videos (use with --save-detections)")
+    parser.add_argument("--timings", action="store_true",
+                       help="Print per-stage timing percentiles at the end of the run (send SIGUSR1 for a summary mid-run)")
+    parser.add_argument("--profile", choices=["cprofile", "torch"],
+                       help="Profile the run and save the trace to the output directory")
+    parser.add_argument("--backend", choices=utils.BACKENDS, default="torch",
+                       help="Inference backend; onnx/openvino export the model once and cache it next to the weights (default: torch)")
+    parser.add_argument("--precision", choices=utils.PRECISIONS, default="fp32",
+                       help="Inference precision; bf16 autocasts torch on the CPU, int8 quantizes an openvino export (default: fp32)")
+    parser.add_argument("--imgsz", type=int,
+                       help="Inference input size in pixels (default: 640)")
+    parser.add_argument("--target-fps", type=float,
+                       help="Calibrate on the input and pick the most accurate --model and --imgsz that reach this FPS")
+    parser.add_argument("--retune", action="store_true",
+                       help="Recalibrate --target-fps instead of reusing the tuned configuration cached for this machine")
+    parser.add_argument("--check-parity", action="store_true",
+                       help="Compare an exported backend or reduced precision against torch fp32 on samples of the input")
+    parser.add_argument("--watch-interval", type=float, default=1.0,
+                       help="Seconds between scans of the watched folder (default: 1.0)")
+    parser.add_argument("--settle-seconds", type=float, default=1.0,
+                       help="Seconds a watched file must stay unchanged before it is processed (default: 1.0)")
+    parser.add_argument("--state-file", type=str,
+                       help="Where the watcher records processed files (default: .detect_watch_state.json in the watched folder)")
+    parser.add_argument("--serve", action="store_true",
+                       help="Keep the model loaded and serve detections over a local HTTP endpoint")
+    parser.add_argument("--host", type=str, default="127.0.0.1",
+                       help="Address the server listens on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000,
+                       help="Port the server listens on (default: 8000)")
+    parser.add_argument("--max-batch", type=int, default=8,
+                       help="Most concurrent requests combined into one model call when serving (default: 8)")
+    parser.add_argument("--max-wait-ms", type=float, default=10,
+                       help="Longest a request waits for others to join its batch when serving (default: 10)")
     args = parser.parse_args()
 
-    # Get the best available device
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    if args.detect_every < 1:
+        parser.error("--detect-every must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.threads is not None and args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if args.encode_threads is not None and args.encode_threads < 1:
+        parser.error("--encode-threads must be at least 1")
+    if args.prefetch < 0:
+        parser.error("--prefetch must be 0 or more")
+    if args.tile_size is not None and args.tile_size < 32:
+        parser.error("--tile-size must be at least 32")
+    if not 0 <= args.tile_overlap < 1:
+        parser.error("--tile-overlap must be between 0 and 1")
+    if args.max_batch < 1:
+        parser.error("--max-batch must be at least 1")
+    if args.resume and (args.image or not (args.folder or args.video)):
+        parser.error("--resume needs --folder or --video")
+    if args.resume and args.save_detections == "npz":
+        parser.error("--resume needs --save-detections jsonl, npz records are only written when a run finishes")
+    if args.segment_seconds is not None and args.segment_seconds <= 0:
+        parser.error("--segment-seconds must be positive")
+    if args.target_fps is not None and args.target_fps <= 0:
+        parser.error("--target-fps must be positive")
+    if args.precision == "int8" and args.backend != "openvino":
+        parser.error("--precision int8 needs --backend openvino")
+    if args.precision == "bf16" and args.backend != "torch":
+        parser.error("--precision bf16 needs --backend torch")
+
+    # Get the best available device and split the CPU cores between the thread pools.
+    # Parallel folder and video runs give each worker process its own share.
     device = utils.get_device()
+    parallel = args.workers > 1 and not args.image and bool(args.folder or args.video)
+    thread_layout = utils.configure_threads(workers=args.workers if parallel else 1, threads=args.threads,
+                                            pin=args.pin_cpus)
     utils.print_device_info(device)
+    if args.precision == "bf16":
+        if device != "cpu":
+            print("Error: --precision bf16 is for CPU inference")
+            return
+        if not utils.bf16_supported():
+            print("Warning: this CPU has no native bfloat16 support, bf16 inference will likely be slower than fp32")
 
-    # Load selected YOLOv8 model with verbosity set to 0 to suppress logs
-    print(f"Loading model: {args.model}")
-    model = YOLO(args.model)
-    model.verbose = False  # Disable YOLO model logging
-    model.to(device)
+    # Pick the model and input size from a short calibration on the actual input
+    if args.target_fps:
+        tune_source = args.image or args.folder or args.video or (args.streams[0] if args.streams else None)
+        samples = utils.load_sample_images(tune_source, count=8) if tune_source else []
+        if not samples:
+            print("Error: --target-fps needs an --image, --folder, --video or --streams input to calibrate on")
+            return
+        tuned = utils.autotune(samples, device, args.target_fps, backend=args.backend, precision=args.precision,
+                               retune=args.retune)
+        if tuned is None:
+            print(f"Warning: no configuration reaches {args.target_fps:g} FPS, using the fastest (yolov8n.pt at 320px)")
+            args.model, args.imgsz = "yolov8n.pt", 320
+        else:
+            args.model, args.imgsz = tuned['model'], tuned['imgsz']
+            print(f"Tuned configuration: {args.model} at {args.imgsz}px ({tuned['fps']:.1f} FPS, "
+                  f"{tuned['agreement']:.1%} agreement with the largest model)")
 
-    # Create output directory
-    output_dir = utils.create_output_dir()
-    print(f"Output will be saved to: {output_dir}")
+    # Export the model once up front so worker processes only load the cached file
+    model_options = {'backend': args.backend, 'imgsz': args.imgsz, 'precision': args.precision}
+    exported = False
+    if args.backend != "torch":
+        _, exported = utils.export_model(args.model, args.backend, args.imgsz or 640, int8=args.precision == "int8")
 
-    # Start timing
-    start_time = time.time()
+    # Load selected YOLOv8 model with verbosity set to 0 to suppress logs.
+    # Parallel folder and video runs load one copy per worker process instead.
+    model = None
+    if args.serve or not parallel:
+        print(f"Loading model: {args.model} ({args.backend}, {args.precision})")
+        model = utils.load_model(args.model, device, **model_options)
 
-    if args.image:
-        # Process single image
-        image_path = Path(args.image)
-        if not image_path.exists():
-            print(f"Error: Image not found at {args.image}")
-            return
-        utils.process_image(model, image_path, output_dir)
+    # Check a new or requested export or reduced precision against the PyTorch fp32 model on samples of the input
+    sample_source = args.image or args.folder or args.video
+    reduced = args.backend != "torch" or args.precision != "fp32"
+    if reduced and (exported or args.check_parity) and sample_source:
+        samples = utils.load_sample_images(sample_source, count=8)
+        if samples:
+            utils.check_backend_parity(args.model, model or utils.load_model(args.model, device, **model_options),
+                                       device, samples, imgsz=args.imgsz)
+
+    # Serve requests with the warm model until interrupted
+    if args.serve:
+        latency = utils.serve(model, args.model, host=args.host, port=args.port, max_batch_size=args.max_batch,
+                              max_wait_ms=args.max_wait_ms, max_per_class=args.max_per_class)
+        if 'request' in latency:
+            stats = latency['request']
+            print(f"\nServed {stats['count']} requests: p50 {stats['p50_ms']:.1f} ms, "
+                  f"p95 {stats['p95_ms']:.1f} ms, p99 {stats['p99_ms']:.1f} ms")
+        return
 
-    elif args.folder:
-        # Process folder of images
-        folder_path = Path(args.folder)
-        if not folder_path.exists():
-            print(f"Error: Folder not found at {args.folder}")
+    # Reduced-resolution decoding only helps when the whole image goes to the model at once
+    decode_size = (args.imgsz or 640) if args.reduced_decode and not args.tile_size else None
+
+    # Open the detection cache, keyed by model and detection parameters
+    cache = None
+    if args.cache_dir:
+        cache = utils.DetectionCache(args.cache_dir, args.model,
+                                     params={'max_per_class': args.max_per_class, 'backend': args.backend,
+                                             'precision': args.precision,
+                                             'imgsz': args.imgsz, 'tile_size': args.tile_size,
+                                             'tile_overlap': args.tile_overlap if args.tile_size else None,
+                                             'decode_size': decode_size},
+                                     max_bytes=args.cache_size_mb * 1024 * 1024)
+
+    # Create output directory, or reuse the one of the interrupted run
+    if args.resume:
+        output_dir = Path(args.resume)
+        if not output_dir.is_dir():
+            print(f"Error: Run directory not found at {args.resume}")
             return
+        print(f"Resuming run in: {output_dir}")
+    else:
+        output_dir = utils.create_output_dir()
+        print(f"Output will be saved to: {output_dir}")
 
-        # Get all image files
-        image_files = utils.get_image_files(folder_path)
+    # Annotated videos are encoded on a background thread; ffmpeg gets its share of the thread budget
+    writer_options = {'backend': args.video_writer}
+    if args.video_writer == "ffmpeg":
+        writer_options.update(codec=args.video_codec, preset=args.video_preset, crf=args.video_crf,
+                              threads=args.encode_threads or thread_layout['opencv_threads'])
 
-        if not image_files:
-            print(f"No images found in {args.folder}")
+    # Record finished folder images and video segments so an interrupted run can be resumed
+    checkpoint = None
+    if not args.image and (args.folder or args.video):
+        run_settings = {
+            'model': args.model, 'backend': args.backend, 'imgsz': args.imgsz, 'precision': args.precision,
+            'max_per_class': args.max_per_class, 'render': not args.no_render,
+            'save_detections': args.save_detections, 'tile_size': args.tile_size,
+            'tile_overlap': args.tile_overlap if args.tile_size else None, 'decode_size': decode_size,
+            'recursive': args.recursive, 'include': args.include, 'exclude': args.exclude,
+            'detect_every': args.detect_every, 'motion_threshold': args.motion_threshold,
+            'segment_seconds': args.segment_seconds,
+            'video_writer': {key: value for key, value in writer_options.items() if key != 'threads'},
+            'video_chunks': args.workers if args.video and parallel and not args.segment_seconds else None
+        }
+        try:
+            checkpoint = utils.RunManifest(output_dir, "folder" if args.folder else "video",
+                                           args.folder or args.video, run_settings, resume=bool(args.resume))
+        except ValueError as e:
+            print(f"Error: Cannot resume {args.resume}: {str(e)}")
             return
 
-        print(f"\nProcessing {len(image_files)} images...")
-        for image_path in tqdm(image_files, desc="Processing images"):
-            utils.process_image(model, image_path, output_dir)
+    # Open the structured detection output, dropping records written after the last checkpoint
+    detection_writer = None
+    if args.save_detections:
+        detection_writer = utils.DetectionWriter(output_dir / f"detections.{args.save_detections}",
+                                                 resume_offset=checkpoint.detections_offset if args.resume else None)
+
+    # Options shared by every image and video processing call
+    options = {
+        'max_per_class': args.max_per_class,
+        'render': not args.no_render,
+        'detection_writer': detection_writer
+    }
 
-    elif args.video:
-        # Process video file
-        video_path = Path(args.video)
-        if not video_path.exists():
-            print(f"Error: Video not found at {args.video}")
+    # Tiled detection only applies to images; videos keep whole-frame inference
+    tile_options = {}
+    if args.tile_size:
+        tile_options = {'tile_size': args.tile_size, 'tile_overlap': args.tile_overlap}
+
+    # Allow a stage timing summary on demand while the run is going
+    if args.timings and hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: print(f"\n{utils.timings.format_summary()}"))
+
+    # Start timing
+    start_time = time.time()
+
+    # Optionally wrap the run in a profiler that writes its trace to the output directory
+    profiler = utils.profile_run(output_dir, args.profile) if args.profile else nullcontext()
+
+    with profiler:
+        if args.image:
+            # Process single image
+            image_path = Path(args.image)
+            if not image_path.exists():
+                print(f"Error: Image not found at {args.image}")
+                return
+            utils.process_image(model, image_path, output_dir, cache=cache, decode_size=decode_size,
+                                **tile_options, **options)
+
+        elif args.folder:
+            # Process folder of images
+            folder_path = Path(args.folder)
+            if not folder_path.exists():
+                print(f"Error: Folder not found at {args.folder}")
+                return
+
+            # Stream image files from the scan so processing starts before it finishes
+            # Never scan this or earlier runs' outputs when they lie inside the folder
+            scan_options = {'recursive': args.recursive, 'include': args.include, 'exclude': args.exclude,
+                            'skip_dirs': [output_dir, utils.OUTPUT_ROOT]}
+            if not utils.has_image_files(folder_path, **scan_options):
+                print(f"No images found in {args.folder}")
+                return
+            image_files = utils.iter_image_files(folder_path, **scan_options)
+            input_root = folder_path if args.recursive else None
+            if checkpoint.files:
+                print(f"Skipping {len(checkpoint.files)} images finished by the interrupted run")
+                image_files = (image_path for image_path in image_files if not checkpoint.is_done(image_path))
+
+            print(f"\nProcessing images from {args.folder}...")
+            if args.workers > 1:
+                # Shard the folder across worker processes
+                utils.process_folder_parallel(args.model, device, image_files, output_dir, args.workers,
+                                              batch_size=args.batch_size, cache=cache,
+                                              model_options=model_options, tile_options=tile_options,
+                                              input_root=input_root, checkpoint=checkpoint,
+                                              decode_size=decode_size, **options)
+            else:
+                # Decode upcoming images on background threads while the model runs
+                if args.prefetch > 0:
+                    loaded = utils.PrefetchLoader(image_files, args.prefetch, workers=thread_layout['opencv_threads'],
+                                                  target_size=decode_size, cache=cache)
+                else:
+                    loaded = ((image_path, None, 1, None) for image_path in image_files)
+
+                if args.batch_size > 1 and not tile_options:
+                    # Group images into batches so each model call covers several files
+                    group_by = (lambda item: item[0].parent) if args.recursive else None
+                    with tqdm(desc="Processing images", unit="images") as pbar:
+                        for batch in utils.batched(loaded, args.batch_size, group_by):
+                            paths = [image_path for image_path, _, _, _ in batch]
+                            images = [loaded_image[1:] for loaded_image in batch]
+                            utils.process_images_batch(model, paths,
+                                                       utils.mirrored_output_dir(output_dir, input_root, paths[0]),
+                                                       cache=cache, images=images, decode_size=decode_size,
+                                                       **options)
+                            checkpoint.mark_files(paths, detection_writer)
+                            pbar.update(len(batch))
+                else:
+                    for image_path, img, scale, cache_key in tqdm(loaded, desc="Processing images", unit="images"):
+                        utils.process_image(model, image_path,
+                                            utils.mirrored_output_dir(output_dir, input_root, image_path),
+                                            cache=cache, cache_key=cache_key, img=img, img_scale=scale,
+                                            decode_size=decode_size, **tile_options, **options)
+                        checkpoint.mark_files([image_path], detection_writer)
+
+        elif args.video:
+            # Process video file
+            video_path = Path(args.video)
+            if not video_path.exists():
+                print(f"Error: Video not found at {args.video}")
+                return
+            if args.workers > 1:
+                # Split the video into frame ranges processed by worker processes
+                utils.process_video_parallel(args.model, device, video_path, output_dir, args.workers,
+                                             detect_every=args.detect_every, motion_threshold=args.motion_threshold,
+                                             model_options=model_options, chunk_seconds=args.segment_seconds,
+                                             checkpoint=checkpoint, writer_options=writer_options, **options)
+            else:
+                utils.process_video(model, video_path, output_dir, progress_bar=True, pipelined=args.pipeline,
+                                    detect_every=args.detect_every, motion_threshold=args.motion_threshold,
+                                    checkpoint=checkpoint, segment_seconds=args.segment_seconds,
+                                    writer_options=writer_options, **options)
+
+        elif args.streams:
+            # Decode every stream concurrently and batch their frames through the one model
+            print(f"\nProcessing {len(args.streams)} streams...")
+            utils.process_streams(model, args.streams, output_dir,
+                                  batch_size=args.batch_size if args.batch_size > 1 else None,
+                                  writer_options=writer_options, **options)
+
+        elif args.watch:
+            # Process files as they arrive until interrupted
+            watch_path = Path(args.watch)
+            if not watch_path.is_dir():
+                print(f"Error: Folder not found at {args.watch}")
+                return
+            utils.watch_folder(model, watch_path, output_dir, state_path=args.state_file,
+                               interval=args.watch_interval, settle_seconds=args.settle_seconds, cache=cache,
+                               video_options={'pipelined': args.pipeline, 'detect_every': args.detect_every,
+                                              'motion_threshold': args.motion_threshold,
+                                              'writer_options': writer_options},
+                               image_options={**tile_options, 'decode_size': decode_size}, **options)
+
+        else:
+            print("Please provide either --image, --folder, --video, --streams or --watch argument")
             return
-        utils.process_video(model, video_path, output_dir, progress_bar=True)
 
-    else:
-        print("Please provide either --image, --folder, or --video argument")
-        return
+    if detection_writer is not None:
+        detection_writer.close()
+    if checkpoint is not None:
+        checkpoint.close()
 
     # Calculate and print total processing time
     end_time = time.time()
@@ -86,7 +407,16 @@ def main():
     print(f"  - Total processing time: {total_processing_time:.2f} seconds")
     print(f"  - Device used: {device_details}")
     print(f"  - Model: {args.model}")
+    print(f"  - Backend: {args.backend} ({args.precision})")
     print(f"  - Output directory: {output_dir}")
+    if detection_writer is not None:
+        print(f"  - Detection records: {detection_writer.records} in {detection_writer.path}")
+    if cache is not None and not parallel:
+        print(f"  - Cache hits: {cache.hits} of {cache.hits + cache.misses}")
+
+    if args.timings:
+        print(f"\nStage Timings:")
+        print(utils.timings.format_summary())
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
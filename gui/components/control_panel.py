@@ -2,19 +2,23 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 import utils.file_utils as file_utils
+from utils.models import PRECISIONS
 import torch
 
 class ControlPanel:
-    def __init__(self, root, theme_manager, preview_manager, on_process_callback, on_cancel_callback, on_show_output_callback):
+    def __init__(self, root, theme_manager, preview_manager, on_process_callback, on_cancel_callback, on_show_output_callback,
+                 on_model_change_callback=None):
         self.root = root
         self.theme_manager = theme_manager
         self.preview_manager = preview_manager
         self.on_process_callback = on_process_callback
         self.on_cancel_callback = on_cancel_callback
         self.on_show_output_callback = on_show_output_callback
+        self.on_model_change_callback = on_model_change_callback
         
         # Initialize variables
         self.model_path = tk.StringVar(value="yolov8m.pt")
+        self.precision = tk.StringVar(value="fp32")
         self.selected_path = tk.StringVar()
         self.input_type = None
         self.progress_var = tk.DoubleVar()
@@ -32,6 +36,18 @@ class ControlPanel:
         model_combo = ttk.Combobox(model_frame, textvariable=self.model_path, state="readonly", width=30)
         model_combo['values'] = ("yolov8n.pt", "yolov8s.pt", "yolov8m.pt", "yolov8l.pt", "yolov8x.pt")
         model_combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        if self.on_model_change_callback is not None:
+            model_combo.bind("<<ComboboxSelected>>", lambda event: self.on_model_change_callback())
+        
+        # Precision selection
+        precision_frame = ttk.Frame(control_frame)
+        precision_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(precision_frame, text="Precision", style="Subtitle.TLabel").pack(side=tk.LEFT, padx=(0, 10))
+        precision_combo = ttk.Combobox(precision_frame, textvariable=self.precision, state="readonly", width=30)
+        precision_combo['values'] = PRECISIONS
+        precision_combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        if self.on_model_change_callback is not None:
+            precision_combo.bind("<<ComboboxSelected>>", lambda event: self.on_model_change_callback())
         
         # Device info
         device_frame = ttk.Frame(control_frame)
@@ -95,19 +111,16 @@ class ControlPanel:
         
         if path.is_file():
             # Check if it's a video file
-            video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.webm', '.flv', '.wmv', '.mpg', '.mpeg', '.m4v', '.webm', '.flv', '.wmv', '.mpg', '.mpeg')
-            if path.suffix.lower() in video_extensions:
+            if path.suffix.lower() in file_utils.VIDEO_EXTENSIONS:
                 return 'video'
             
             # Check if it's an image file
-            image_extensions = ('.jpg', '.jpeg', '.png', '.bmp', '.tiff')
-            if path.suffix.lower() in image_extensions:
+            if path.suffix.lower() in file_utils.IMAGE_EXTENSIONS:
                 return 'image'
                 
         elif path.is_dir():
-            # Check if directory contains images
-            image_files = file_utils.get_image_files(path)
-            if image_files:
+            # Check if directory contains images, stopping at the first one
+            if file_utils.has_image_files(path):
                 return 'folder'
                 
         return None
@@ -117,9 +130,9 @@ class ControlPanel:
         path = filedialog.askopenfilename(
             title="Select File or Folder",
             filetypes=[
-                ("All supported files", "*.jpg *.jpeg *.png *.mp4 *.avi *.mov *.mkv"),
-                ("Image files", "*.jpg *.jpeg *.png"),
-                ("Video files", "*.mp4 *.avi *.mov *.mkv"),
+                ("All supported files", " ".join(f"*{ext}" for ext in file_utils.IMAGE_EXTENSIONS + file_utils.VIDEO_EXTENSIONS)),
+                ("Image files", " ".join(f"*{ext}" for ext in file_utils.IMAGE_EXTENSIONS)),
+                ("Video files", " ".join(f"*{ext}" for ext in file_utils.VIDEO_EXTENSIONS)),
                 ("All files", "*.*")
             ]
         )
@@ -1,15 +1,26 @@
 import tkinter as tk
+import time
 from PIL import Image, ImageTk
 import cv2
 from pathlib import Path
+from utils.profiling import stage
+from ..utils.frame_buffer import LatestFrameBuffer
 
 class PreviewManager:
-    def __init__(self, root, theme_manager):
+    def __init__(self, root, theme_manager, display_fps=30):
         self.root = root
         self.theme_manager = theme_manager
         self.current_image = None
         self.current_result = None
         self.video_capture = None
+
+        # Processed video frames are resized by the worker and shown at a fixed rate
+        self.display_interval = 1 / display_fps
+        self.frame_buffer = LatestFrameBuffer()
+        self.result_size = (0, 0)
+        self._last_submit = 0.0
+        self._result_item = None
+        self._polling = False
         
     def setup_preview_frames(self, parent):
         """Setup the preview frames and canvases"""
@@ -34,13 +45,20 @@ class PreviewManager:
                                      bg=self.theme_manager.get_theme_color("canvas"),
                                      highlightthickness=0)
         self.result_canvas.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        # Track the canvas size on the Tk thread so workers can size frames without calling Tk
+        self.result_canvas.bind("<Configure>", self._on_result_resize)
         
         return preview_frame
+
+    def _on_result_resize(self, event):
+        self.result_size = (event.width, event.height)
         
     def clear_previews(self):
         """Clear both preview canvases"""
         self.original_canvas.delete("all")
         self.result_canvas.delete("all")
+        self._result_item = None
         if self.video_capture is not None:
             self.video_capture.release()
             self.video_capture = None
@@ -104,18 +122,55 @@ class PreviewManager:
                 
         update_preview()
         
-    def update_video_preview(self, frame):
-        """Update the result canvas with a processed video frame"""
-        # Convert BGR to RGB
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        # Convert to PIL Image
-        image = Image.fromarray(frame)
-        # Resize
-        canvas_width = self.result_canvas.winfo_width()
-        canvas_height = self.result_canvas.winfo_height()
-        image.thumbnail((canvas_width, canvas_height), Image.Resampling.LANCZOS)
-        
-        photo = ImageTk.PhotoImage(image)
-        self.result_canvas.image = photo
-        self.result_canvas.create_image(canvas_width//2, canvas_height//2, 
-                                      image=photo, anchor=tk.CENTER) 
\ No newline at end of file
+    def submit_video_frame(self, frame):
+        """Offer a processed video frame for the preview; called from the processing thread
+
+        Frames arriving faster than the display rate are dropped before any
+        work is done on them. The rest are shrunk to the canvas size and
+        converted to RGB here, so the Tk thread only has to display them.
+        """
+        now = time.perf_counter()
+        canvas_width, canvas_height = self.result_size
+        if now - self._last_submit < self.display_interval or canvas_width < 2 or canvas_height < 2:
+            return
+        self._last_submit = now
+
+        with stage("preview"):
+            height, width = frame.shape[:2]
+            scale = min(canvas_width / width, canvas_height / height, 1.0)
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR) if scale < 1.0 else frame
+            self.frame_buffer.put(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+
+    def start_video_preview(self):
+        """Start pulling the latest processed frame onto the result canvas at the display rate"""
+        self.frame_buffer.take()
+        if self._polling:
+            return  # A display loop is already running
+        self._polling = True
+        self._poll_video_preview()
+
+    def stop_video_preview(self):
+        """Stop the display loop after showing the last submitted frame"""
+        self._polling = False
+        self._show_latest_frame()
+
+    def _poll_video_preview(self):
+        if not self._polling:
+            return
+        self._show_latest_frame()
+        self.root.after(int(self.display_interval * 1000), self._poll_video_preview)
+
+    def _show_latest_frame(self):
+        frame = self.frame_buffer.take()
+        if frame is None:
+            return
+        photo = ImageTk.PhotoImage(Image.fromarray(frame))
+        self.result_canvas.image = photo  # Keep reference
+        center = (self.result_size[0] // 2, self.result_size[1] // 2)
+        if self._result_item is None:
+            self._result_item = self.result_canvas.create_image(*center, image=photo, anchor=tk.CENTER)
+        else:
+            # Reuse one canvas item instead of stacking a new image per frame
+            self.result_canvas.coords(self._result_item, *center)
+            self.result_canvas.itemconfigure(self._result_item, image=photo) 
\ No newline at end of file
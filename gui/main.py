@@ -1,9 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
 from pathlib import Path
-from ultralytics import YOLO
 import utils.device as device_utils
 import utils.file_utils as file_utils
+from utils.models import check_backend_parity
+from utils.profiling import timings, stage, record_model_speed
+from utils.video_writer import open_video_writer
 import torch
 from tqdm import tqdm
 import time
@@ -13,6 +15,7 @@ import subprocess
 import cv2
 
 from .utils.theme_manager import ThemeManager
+from .utils.model_manager import ModelManager
 from .components.preview_manager import PreviewManager
 from .components.control_panel import ControlPanel
 
@@ -30,23 +33,31 @@ class ObjectDetectionApp:
         # Initialize managers
         self.theme_manager = ThemeManager()
         self.preview_manager = PreviewManager(self.root, self.theme_manager)
+        self.model_manager = ModelManager()
         self.control_panel = ControlPanel(
             self.root, 
             self.theme_manager,
             self.preview_manager,
             self.process_files,
             self.cancel_processing,
-            self.show_output_folder
+            self.show_output_folder,
+            self.preload_model
         )
+        self.device = device_utils.get_device()
+        device_utils.configure_threads()
         
         # Initialize processing state
         self.is_processing = False
         self.should_stop = False
         self.output_dir = None
+        self.precision_checked = set()
         
         # Setup UI
         self.setup_ui()
         
+        # Start loading the default model while the user picks an input
+        self.preload_model()
+        
     def setup_ui(self):
         """Setup the main UI layout"""
         # Create main frame
@@ -65,6 +76,25 @@ class ObjectDetectionApp:
         # Setup preview frames
         self.preview_manager.setup_preview_frames(main_frame)
         
+    def preload_model(self):
+        """Load and warm up the selected model in the background"""
+        model_path = self.control_panel.model_path.get()
+        precision = self.control_panel.precision.get()
+        if self.model_manager.is_loaded(model_path, self.device, precision):
+            return
+        if not self.is_processing:
+            self.control_panel.update_status(f"Loading {model_path} ({precision})...")
+        self.model_manager.preload(model_path, self.device, self._on_model_loaded, precision)
+        
+    def _on_model_loaded(self, model_path, error):
+        """Report the result of a background model load"""
+        if self.is_processing or model_path != self.control_panel.model_path.get():
+            return
+        if error is not None:
+            self.root.after(0, lambda: self.control_panel.update_status(f"Failed to load {model_path}: {error}"))
+        else:
+            self.root.after(0, lambda: self.control_panel.update_status(f"{model_path} ready"))
+        
     def process_files(self):
         """Start processing files"""
         if not self.control_panel.selected_path.get():
@@ -91,20 +121,30 @@ class ObjectDetectionApp:
         """Process files in a separate thread"""
         try:
             # Get the best available device
-            device = device_utils.get_device()
+            device = self.device
             device_utils.print_device_info(device)
             
             # Update device info in UI
             self.root.after(0, lambda: self.control_panel.update_device_info(device))
             
-            # Load selected YOLOv8 model
-            model = YOLO(self.control_panel.model_path.get())
-            model.to(device)
+            # Get the selected YOLOv8 model, reusing it if it is already loaded
+            model_path = self.control_panel.model_path.get()
+            precision = self.control_panel.precision.get()
+            model = self.model_manager.get(model_path, device, precision)
+            
+            # Log how a reduced precision compares with fp32 the first time it is used
+            if precision != "fp32" and (model_path, precision) not in self.precision_checked:
+                samples = file_utils.load_sample_images(self.control_panel.selected_path.get(), count=8)
+                if samples:
+                    self.root.after(0, lambda: self.control_panel.update_status(f"Comparing {precision} with fp32..."))
+                    check_backend_parity(model_path, model, device, samples)
+                    self.precision_checked.add((model_path, precision))
             
             # Create output directory
             self.output_dir = file_utils.create_output_dir()
             
             # Start timing
+            timings.reset()
             start_time = time.time()
             last_progress_time = time.time()
             processed_frames = 0
@@ -160,6 +200,9 @@ class ObjectDetectionApp:
                     f"Output saved to: {self.output_dir}"
                 ))
                 
+                # Log where the time went
+                print(f"\nStage Timings:\n{timings.format_summary()}")
+                
         except Exception as e:
             self.root.after(0, lambda: tk.messagebox.showerror("Error", f"An error occurred: {str(e)}"))
             self.root.after(0, lambda: self.control_panel.update_status("Processing failed!"))
@@ -176,11 +219,14 @@ class ObjectDetectionApp:
             return
             
         # Process single image
-        results = model(image_path, verbose=False)
+        with stage("inference"):
+            results = model(image_path, verbose=False)
+        record_model_speed(results)
         # Save results
         for r in results:
             im_path = output_dir / f"{image_path.stem}_result{image_path.suffix}"
-            r.save(im_path)
+            with stage("encode"):
+                r.save(im_path)
             # Update result preview
             self.root.after(0, lambda: self.preview_manager.show_image(str(im_path), 
                                                                     self.preview_manager.result_canvas))
@@ -200,43 +246,54 @@ class ObjectDetectionApp:
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         
-        # Create video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
+        # Create video writer, encoding on a background thread
+        out = open_video_writer(output_path, fps, (width, height))
         
         # Process frames
         frame_count = 0
         start_time = time.time()
         last_progress_time = time.time()
+        self.root.after(0, self.preview_manager.start_video_preview)
         
-        while cap.isOpened() and not self.should_stop:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        try:
+            while cap.isOpened() and not self.should_stop:
+                with stage("decode"):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
                 
-            # Process frame
-            results = model(frame, verbose=False)
+                # Process frame
+                with stage("inference"):
+                    results = model(frame, verbose=False)
+                record_model_speed(results)
             
-            # Get annotated frame
-            annotated_frame = results[0].plot()
+                # Get annotated frame
+                with stage("draw"):
+                    annotated_frame = results[0].plot()
             
-            # Write frame
-            out.write(annotated_frame)
+                # Write frame
+                with stage("encode"):
+                    out.write(annotated_frame)
             
-            # Update preview
-            self.root.after(0, lambda: self.preview_manager.update_video_preview(annotated_frame))
+                # Hand the frame to the preview, which keeps only the latest one
+                self.preview_manager.submit_video_frame(annotated_frame)
             
-            # Update progress
-            frame_count += 1
-            progress = (frame_count / total_frames) * 100
-            current_time = time.time()
-            if current_time - last_progress_time >= 0.5:  # Update every 0.5 seconds
-                processing_fps = frame_count / (current_time - start_time)
-                self.root.after(0, lambda: self.control_panel.update_progress(progress, processing_fps))
-                last_progress_time = current_time
+                # Update progress
+                frame_count += 1
+                progress = (frame_count / total_frames) * 100
+                current_time = time.time()
+                if current_time - last_progress_time >= 0.5:  # Update every 0.5 seconds
+                    processing_fps = frame_count / (current_time - start_time)
+                    self.root.after(0, lambda: self.control_panel.update_progress(progress, processing_fps))
+                    last_progress_time = current_time
             
-        cap.release()
-        out.release()
+        finally:
+            # Stop the preview loop even when processing fails, so the next run starts a single one
+            cap.release()
+            try:
+                out.release()
+            finally:
+                self.root.after(0, self.preview_manager.stop_video_preview)
         
     def cancel_processing(self):
         """Cancel the current processing operation"""
@@ -0,0 +1,27 @@
+import threading
+
+class LatestFrameBuffer:
+    """Single-slot buffer that only keeps the most recent frame
+
+    The processing thread puts frames as fast as it produces them and the UI
+    takes whatever is newest when it redraws, so a slow display drops frames
+    instead of queueing them and holding back processing.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def put(self, frame):
+        """Replace the buffered frame, dropping it if it was never taken"""
+        with self._lock:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+
+    def take(self):
+        """Return the newest frame and empty the slot, or None if nothing new arrived"""
+        with self._lock:
+            frame, self._frame = self._frame, None
+        return frame
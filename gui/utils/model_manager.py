@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+from utils.models import load_model
+
+class ModelManager:
+    """Keep recently used YOLO models loaded and warmed up between runs
+
+    Models are cached per (model path, device, precision) with an LRU bound, so pressing
+    Process again reuses the model already in memory. Loading can be started
+    ahead of time on a background thread, and concurrent requests for a model
+    that is still loading wait for that load instead of starting another one.
+    int8 models are loaded as quantized OpenVINO exports, all others with PyTorch.
+    """
+
+    def __init__(self, max_models=2, warmup_size=640):
+        self.max_models = max_models
+        self.warmup_size = warmup_size
+        self._models = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, model_path, device, precision="fp32"):
+        """Check whether a model is already cached"""
+        with self._lock:
+            return (model_path, device, precision) in self._models
+
+    def get(self, model_path, device, precision="fp32"):
+        """Return a loaded, warmed-up model, loading it first if needed"""
+        key = (model_path, device, precision)
+        while True:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+
+            # Another thread is loading this model; wait for it and check again
+            loading.wait()
+
+        try:
+            backend = "openvino" if precision == "int8" else "torch"
+            model = load_model(model_path, device, backend=backend, precision=precision)
+            self._warm_up(model)
+            with self._lock:
+                self._models[key] = model
+                while len(self._models) > self.max_models:
+                    self._models.popitem(last=False)
+            return model
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    def preload(self, model_path, device, on_ready=None, precision="fp32"):
+        """Load and warm up a model on a background thread
+
+        on_ready(model_path, error) is called from that thread once the model
+        is available, with error set to the exception if loading failed.
+        """
+        def load():
+            error = None
+            try:
+                self.get(model_path, device, precision)
+            except Exception as e:
+                error = e
+            if on_ready is not None:
+                on_ready(model_path, error)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def _warm_up(self, model):
+        """Run one inference so the first real frame does not pay for initialisation"""
+        model(np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8), verbose=False)
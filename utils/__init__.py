@@ -1,14 +1,62 @@
-from .device import get_device, print_device_info
-from .file_utils import create_output_dir, get_image_files
-from .visualization import draw_detection
-from .processing import process_image, process_video
+from .device import get_device, print_device_info, configure_threads
+from .file_utils import (create_output_dir, get_image_files, iter_image_files, has_image_files,
+                         batched, mirrored_output_dir, load_sample_images, IMAGE_EXTENSIONS, VIDEO_EXTENSIONS,
+                         OUTPUT_ROOT)
+from .visualization import draw_detection, draw_detections
+from .postprocess import select_detections
+from .models import load_model, export_model, check_backend_parity, bf16_supported, BACKENDS, PRECISIONS
+from .cache import DetectionCache
+from .profiling import timings, profile_run
+from .detection_writer import DetectionWriter, FORMATS as DETECTION_FORMATS
+from .loader import PrefetchLoader
+from .checkpoint import RunManifest
+from .video_writer import open_video_writer, WRITER_BACKENDS
+from .autotune import autotune
+from .processing import process_image, process_images_batch, process_video
+from .parallel import process_folder_parallel, process_video_parallel
+from .multistream import process_streams
+from .server import serve
+from .watcher import watch_folder
 
 __all__ = [
     'get_device',
     'print_device_info',
+    'configure_threads',
     'create_output_dir',
     'get_image_files',
+    'iter_image_files',
+    'has_image_files',
+    'batched',
+    'mirrored_output_dir',
+    'IMAGE_EXTENSIONS',
+    'VIDEO_EXTENSIONS',
+    'OUTPUT_ROOT',
+    'load_sample_images',
     'draw_detection',
+    'draw_detections',
+    'select_detections',
+    'load_model',
+    'export_model',
+    'check_backend_parity',
+    'bf16_supported',
+    'BACKENDS',
+    'PRECISIONS',
+    'DetectionCache',
+    'DetectionWriter',
+    'DETECTION_FORMATS',
+    'timings',
+    'profile_run',
+    'PrefetchLoader',
+    'RunManifest',
+    'open_video_writer',
+    'WRITER_BACKENDS',
+    'autotune',
     'process_image',
-    'process_video'
+    'process_images_batch',
+    'process_video',
+    'process_folder_parallel',
+    'process_video_parallel',
+    'process_streams',
+    'serve',
+    'watch_folder'
 ] 
\ No newline at end of file
@@ -0,0 +1,123 @@
+import json
+import os
+import platform
+import time
+from pathlib import Path
+import torch
+from .models import load_model
+from .postprocess import match_detections, select_detections
+
+# Model variants from least to most accurate
+MODEL_VARIANTS = ("yolov8n.pt", "yolov8s.pt", "yolov8m.pt", "yolov8l.pt", "yolov8x.pt")
+IMAGE_SIZES = (320, 416, 512, 640, 800, 960, 1280)
+DEFAULT_CACHE_PATH = Path("~/.cache/yolo_detection/autotune.json")
+
+def machine_id(device):
+    """Describe the machine and device a tuning result is valid for"""
+    device_name = torch.cuda.get_device_name(0) if device == "cuda" else platform.processor() or platform.machine()
+    return f"{platform.node()}|{device}|{device_name}|{os.cpu_count()}"
+
+def candidate_sizes(image_shape):
+    """Inference sizes worth trying for an input, up to the next size above its longer side"""
+    longest = max(image_shape[:2])
+    sizes = []
+    for size in IMAGE_SIZES:
+        sizes.append(size)
+        if size >= longest:
+            break
+    return sizes
+
+def measure_fps(model, samples, warmup=1):
+    """Frames per second of single-frame model calls on the samples, after a warmup call"""
+    for sample in samples[:warmup]:
+        model(sample, verbose=False)
+    start = time.perf_counter()
+    for sample in samples:
+        model(sample, verbose=False)
+    return len(samples) / (time.perf_counter() - start)
+
+def detect_all(model, samples):
+    """Every detection the model finds in each sample"""
+    return [select_detections(model(sample, verbose=False)[0], model.names, max_per_class=0) for sample in samples]
+
+def agreement(reference, candidate, iou_threshold=0.5):
+    """F1 score of candidate detections against reference detections over all samples"""
+    matched = reference_boxes = candidate_boxes = 0
+    for reference_detections, candidate_detections in zip(reference, candidate):
+        matched += match_detections(reference_detections, candidate_detections, iou_threshold)['matched']
+        reference_boxes += len(reference_detections)
+        candidate_boxes += len(candidate_detections)
+    if reference_boxes + candidate_boxes == 0:
+        return 1.0
+    return 2 * matched / (reference_boxes + candidate_boxes)
+
+def autotune(samples, device, target_fps, backend="torch", precision="fp32", cache_path=None, retune=False):
+    """Pick the most accurate model variant and inference size that reaches target_fps
+
+    Every variant is timed on the samples at increasing inference sizes until
+    it falls below the target, and larger variants are skipped once even the
+    smallest size of a variant is too slow. For each variant only its largest
+    fast enough size is kept, and the survivors are ranked by how well their
+    detections agree (F1 at IoU 0.5) with the largest variant at the largest
+    size in PyTorch fp32 on the same samples, which stands in for ground
+    truth. Ties go to the larger variant.
+
+    Results are cached in cache_path (default: ~/.cache/yolo_detection/autotune.json)
+    per machine, device, backend, precision, target and input resolution, and reused
+    unless retune is set.
+
+    Returns a dict with the chosen model, imgsz, measured fps and agreement,
+    or None when no configuration reaches the target.
+    """
+    cache_path = Path(cache_path or DEFAULT_CACHE_PATH).expanduser()
+    height, width = samples[0].shape[:2]
+    key = f"{machine_id(device)}|{backend}|{precision}|{width}x{height}|{target_fps:g}"
+    cached = {}
+    if cache_path.exists():
+        with open(cache_path) as f:
+            cached = json.load(f)
+    if key in cached and not retune:
+        print(f"Using tuned configuration for {width}x{height} at {target_fps:g} FPS from {cache_path}")
+        return cached[key]
+
+    sizes = candidate_sizes(samples[0].shape)
+    print(f"Calibrating for {target_fps:g} FPS on {len(samples)} samples of {width}x{height}...")
+
+    # Time each variant at growing sizes; bigger variants and sizes only get slower
+    fast_enough = []
+    for model_path in MODEL_VARIANTS:
+        best = None
+        model = None
+        for imgsz in sizes:
+            # Exported backends are built for one input size; torch models just change it
+            if model is None or backend != "torch":
+                model = load_model(model_path, device, backend=backend, imgsz=imgsz, precision=precision)
+            model.overrides['imgsz'] = imgsz
+            fps = measure_fps(model, samples)
+            print(f"  - {model_path} at {imgsz}px: {fps:.1f} FPS")
+            if fps < target_fps:
+                break
+            best = {'model': model_path, 'imgsz': imgsz, 'fps': round(fps, 2), 'model_obj': model}
+        if best is None:
+            break
+        fast_enough.append(best)
+
+    if not fast_enough:
+        return None
+
+    # Rank the candidates by agreement with the most accurate configuration
+    reference = load_model(MODEL_VARIANTS[-1], device, imgsz=sizes[-1])
+    reference_detections = detect_all(reference, samples)
+    for candidate in fast_enough:
+        candidate['model_obj'].overrides['imgsz'] = candidate['imgsz']
+        candidate['agreement'] = round(agreement(reference_detections,
+                                                 detect_all(candidate.pop('model_obj'), samples)), 4)
+        print(f"  - {candidate['model']} at {candidate['imgsz']}px agrees {candidate['agreement']:.1%} "
+              f"with {MODEL_VARIANTS[-1]} at {sizes[-1]}px")
+    choice = max(reversed(fast_enough), key=lambda candidate: candidate['agreement'])
+
+    cached[key] = choice
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_path, "w") as f:
+        json.dump(cached, f, indent=1)
+    return choice
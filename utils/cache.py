@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+class DetectionCache:
+    """Persistent on-disk cache of detection results
+
+    Entries are keyed by a hash of the input file's content, the model name
+    and the detection parameters, so renamed or re-submitted files still hit.
+    Each entry stores the detections as JSON and, optionally, the encoded
+    annotated output so a hit can skip decoding, inference and drawing. The
+    total size is bounded by evicting the least recently used entries.
+    Eviction goes down to a low-water mark below max_bytes, so the full
+    scan of the cache it needs only happens once in a while.
+    """
+
+    # Fraction of max_bytes the cache is trimmed to when it overflows
+    LOW_WATER = 0.9
+
+    def __init__(self, cache_dir, model_name, params=None, max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.model_name = str(model_name)
+        self.params = params or {}
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._total_bytes = None
+
+    def __getstate__(self):
+        # Worker processes recount the cache size themselves
+        state = self.__dict__.copy()
+        state['_total_bytes'] = None
+        return state
+
+    def key(self, path):
+        """Build the cache key for an input file"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        context = json.dumps({
+            'model': self.model_name,
+            'params': self.params,
+            'suffix': Path(path).suffix.lower()
+        }, sort_keys=True)
+        digest.update(context.encode())
+        return digest.hexdigest()
+
+    def _entry_paths(self, key):
+        """Paths of the detections and output files for a key"""
+        entry_dir = self.cache_dir / key[:2]
+        return entry_dir / f"{key}.json", entry_dir / f"{key}.bin"
+
+    def contains(self, key):
+        """Whether an entry is stored for a key, without reading it or counting a hit"""
+        return self._entry_paths(key)[0].exists()
+
+    def get(self, key):
+        """Return (detections, output_bytes) for a key, or None on a miss
+
+        output_bytes is None when the entry was stored without an output file.
+        """
+        detections_path, output_path = self._entry_paths(key)
+        try:
+            with open(detections_path) as f:
+                detections = json.load(f)
+            output_bytes = output_path.read_bytes() if output_path.exists() else None
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # Mark the entry as recently used
+        os.utime(detections_path)
+        self.hits += 1
+        for detection in detections:
+            detection['box'] = tuple(detection['box'])
+        return detections, output_bytes
+
+    def put(self, key, detections, output_bytes=None):
+        """Store detections and optionally the encoded output for a key"""
+        detections_path, output_path = self._entry_paths(key)
+        detections_path.parent.mkdir(exist_ok=True)
+
+        # Write to temporary files first so readers never see partial entries
+        added = 0
+        if output_bytes is not None:
+            tmp_path = output_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_bytes(output_bytes)
+            os.replace(tmp_path, output_path)
+            added += len(output_bytes)
+        data = json.dumps(detections).encode()
+        tmp_path = detections_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, detections_path)
+        added += len(data)
+
+        if self._total_bytes is None:
+            self._total_bytes = self._scan()[1]
+        else:
+            self._total_bytes += added
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _scan(self):
+        """List cache entries as (last used, key, size) and the total size"""
+        entries = []
+        total = 0
+        for detections_path in self.cache_dir.glob("*/*.json"):
+            try:
+                size = detections_path.stat().st_size
+                last_used = detections_path.stat().st_mtime
+                output_path = detections_path.with_suffix(".bin")
+                if output_path.exists():
+                    size += output_path.stat().st_size
+            except OSError:
+                continue
+            entries.append((last_used, detections_path.stem, size))
+            total += size
+        return entries, total
+
+    def _evict(self):
+        """Remove least recently used entries until the cache is back under its low-water mark"""
+        entries, total = self._scan()
+        entries.sort()
+        for _, key, size in entries:
+            if total <= self.max_bytes * self.LOW_WATER:
+                break
+            for path in self._entry_paths(key):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+        self._total_bytes = total
@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+
+MANIFEST_NAME = "manifest.jsonl"
+
+class RunManifest:
+    """Progress of a folder or video run, recorded in its output directory
+
+    The first line of the manifest describes the run (mode, source and
+    settings) and each following line records finished work: a list of
+    completed image files, a completed video segment, or the end of the run.
+    Every line also stores the size of the detection records file at that
+    point, so a resumed run can drop records written after the last
+    checkpoint and carry on appending without duplicates.
+
+    Lines are only ever appended, so a checkpoint costs the same however far
+    the run has got, and a line torn by a kill is dropped on load.
+    """
+
+    def __init__(self, output_dir, mode, source, settings, resume=False):
+        self.path = Path(output_dir) / MANIFEST_NAME
+        self.mode = mode
+        self.source = Path(source)
+        self.files = set()
+        self.segments = {}
+        self.complete = False
+        self.detections_offset = 0
+
+        if resume:
+            self._load(settings)
+            self._file = open(self.path, "a", buffering=1)
+        else:
+            self._file = open(self.path, "w", buffering=1)
+            self._append({'mode': mode, 'source': str(source), 'settings': settings})
+
+    def _load(self, settings):
+        """Read the finished work of an interrupted run and check it matches this one"""
+        if not self.path.exists():
+            raise ValueError(f"No {MANIFEST_NAME} found in {self.path.parent}")
+
+        with open(self.path, "rb") as f:
+            lines = f.read().split(b"\n")
+        # Keep only complete lines; anything after the last newline was cut off mid-write
+        valid_bytes = 0
+        entries = []
+        for line in lines[:-1]:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+            valid_bytes += len(line) + 1
+        if not entries:
+            raise ValueError(f"{self.path} is empty or unreadable")
+
+        header = entries[0]
+        if header.get('mode') != self.mode or Path(header.get('source', '')) != self.source:
+            raise ValueError(f"{self.path.parent} is a {header.get('mode')} run of {header.get('source')}, "
+                             f"not a {self.mode} run of {self.source}")
+        changed = sorted(key for key in header['settings'].keys() | settings.keys()
+                         if header['settings'].get(key) != settings.get(key))
+        if changed:
+            raise ValueError(f"Settings differ from the interrupted run: {', '.join(changed)}")
+
+        for entry in entries[1:]:
+            self.files.update(entry.get('files', ()))
+            if 'segment' in entry:
+                self.segments[entry['segment']] = entry['frames']
+            self.complete = self.complete or entry.get('complete', False)
+            self.detections_offset = entry['detections_offset']
+
+        with open(self.path, "r+b") as f:
+            f.truncate(valid_bytes)
+
+    def _append(self, entry, detection_writer=None):
+        """Write one manifest line, recording where the detection records end"""
+        if detection_writer is not None:
+            self.detections_offset = detection_writer.tell()
+        entry['detections_offset'] = self.detections_offset
+        self._file.write(json.dumps(entry) + "\n")
+
+    def _key(self, path):
+        """Name a file by its path relative to the source folder"""
+        path = Path(path)
+        try:
+            return path.relative_to(self.source).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def is_done(self, path):
+        """Check whether an image file was finished by this or an earlier run"""
+        return self._key(path) in self.files
+
+    def mark_files(self, paths, detection_writer=None):
+        """Record image files whose outputs and detection records have been written"""
+        keys = [self._key(path) for path in paths]
+        self.files.update(keys)
+        self._append({'files': keys}, detection_writer)
+
+    def mark_segment(self, index, frames, detection_writer=None):
+        """Record a video segment whose output and detection records have been written"""
+        self.segments[index] = frames
+        self._append({'segment': index, 'frames': frames}, detection_writer)
+
+    def mark_complete(self, detection_writer=None):
+        """Record that the whole run finished"""
+        self.complete = True
+        self._append({'complete': True}, detection_writer)
+
+    def close(self):
+        """Close the manifest file"""
+        self._file.close()
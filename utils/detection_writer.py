@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+import numpy as np
+
+FORMATS = ("jsonl", "npz")
+
+def detection_to_json(detection):
+    """Convert a detection dict to plain JSON-serialisable values"""
+    return {
+        'class_id': int(detection['class_id']),
+        'class_name': detection['class_name'],
+        'conf': round(float(detection['conf']), 5),
+        'box': [round(float(value), 2) for value in detection['box']]
+    }
+
+class DetectionWriter:
+    """Write per-image and per-frame detection records to JSONL or compressed NumPy
+
+    JSONL output is streamed one record per image or frame as results come in.
+    NPZ output keeps one row per detection in memory and is written with
+    np.savez_compressed when the writer is closed, with these arrays:
+    sources, source_index, frame_index, timestamp, class_id, conf, boxes,
+    class_names and class_name_ids.
+
+    With resume_offset set, an existing JSONL file is cut back to that many
+    bytes and appended to, e.g. to continue an interrupted run.
+    """
+
+    def __init__(self, path, fmt=None, resume_offset=None):
+        self.path = Path(path)
+        self.format = fmt or self.path.suffix.lstrip(".").lower()
+        if self.format not in FORMATS:
+            raise ValueError(f"Unsupported detection format: {self.format}")
+
+        self.records = 0
+        if self.format == "jsonl":
+            if resume_offset is None:
+                self._file = open(self.path, "w", buffering=1)
+            else:
+                self._file = open(self.path, "a", buffering=1)
+                self._file.truncate(resume_offset)
+                self._file.seek(resume_offset)
+        elif resume_offset is not None:
+            raise ValueError("Only JSONL detection records can be resumed")
+        else:
+            self._sources = []
+            self._source_index = {}
+            self._class_names = {}
+            self._rows = []
+
+    def write(self, source, detections, frame_index=None, timestamp=None):
+        """Record the detections for one image, or one frame of a video"""
+        self.records += 1
+        if self.format == "jsonl":
+            record = {
+                'source': str(source),
+                'frame_index': frame_index,
+                'timestamp': timestamp,
+                'detections': [detection_to_json(detection) for detection in detections]
+            }
+            self._file.write(json.dumps(record) + "\n")
+            return
+
+        source = str(source)
+        if source not in self._source_index:
+            self._source_index[source] = len(self._sources)
+            self._sources.append(source)
+        source_index = self._source_index[source]
+        for detection in detections:
+            self._class_names[detection['class_id']] = detection['class_name']
+            self._rows.append((source_index,
+                               -1 if frame_index is None else frame_index,
+                               np.nan if timestamp is None else timestamp,
+                               detection['class_id'],
+                               detection['conf'],
+                               *detection['box']))
+
+    def tell(self):
+        """Size in bytes of the JSONL records written so far, 0 for NPZ"""
+        return self._file.tell() if self.format == "jsonl" else 0
+
+    def close(self):
+        """Flush and close the output file"""
+        if self.format == "jsonl":
+            self._file.close()
+            return
+
+        rows = np.array(self._rows, dtype=np.float64).reshape(-1, 9)
+        class_ids = sorted(self._class_names)
+        np.savez_compressed(
+            self.path,
+            sources=np.array(self._sources, dtype=str),
+            source_index=rows[:, 0].astype(np.int32),
+            frame_index=rows[:, 1].astype(np.int64),
+            timestamp=rows[:, 2],
+            class_id=rows[:, 3].astype(np.int32),
+            conf=rows[:, 4].astype(np.float32),
+            boxes=rows[:, 5:9].astype(np.float32),
+            class_names=np.array([self._class_names[class_id] for class_id in class_ids], dtype=str),
+            class_name_ids=np.array(class_ids, dtype=np.int32)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,5 +1,13 @@
+import os
+import platform
+import subprocess
+from pathlib import Path
+import cv2
 import torch
 
+# Thread layout applied to this process by configure_threads, reported by print_device_info
+_thread_layout = None
+
 def get_device():
     """Determine the best available device for processing"""
     if torch.cuda.is_available():
@@ -9,10 +17,118 @@ def get_device():
     else:
         return "cpu"
 
+def allowed_cpus():
+    """Logical CPUs this process may run on, honouring affinity masks and container limits"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def core_cpus():
+    """One logical CPU per physical core among the allowed CPUs
+
+    Hyper-threaded siblings share a core's execution units, so running one
+    inference thread per physical core is usually faster and steadier than
+    one per logical CPU. Cores are found from the Linux sysfs topology, or
+    counted with sysctl on macOS.
+    """
+    cpus = allowed_cpus()
+    if platform.system() == "Darwin":
+        try:
+            physical = int(subprocess.check_output(["sysctl", "-n", "hw.physicalcpu"], text=True))
+            return cpus[:physical]
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            return cpus
+
+    cores = {}
+    for cpu in cpus:
+        try:
+            siblings = Path(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list").read_text().strip()
+        except OSError:
+            siblings = str(cpu)
+        cores.setdefault(siblings, cpu)
+    return sorted(cores.values())
+
+def plan_threads(workers=1, threads=None, pin=False):
+    """Split the physical cores into thread budgets for `workers` processes
+
+    Each process gets an equal share of the physical cores for PyTorch's
+    intra-op pool (or `threads` if given), a single inter-op thread, and a
+    quarter of its share for OpenCV, which mostly runs beside the model on
+    other threads (decoding, drawing, encoding). With pin=True each process
+    is later pinned to its own cores, where the platform supports it.
+    """
+    cores = core_cpus()
+    share = max(1, len(cores) // workers)
+    threads = threads or share
+    return {
+        'physical_cores': len(cores),
+        'logical_cpus': len(allowed_cpus()),
+        'workers': workers,
+        'threads': threads,
+        'interop_threads': 1,
+        'opencv_threads': max(1, threads // 4),
+        'core_cpus': cores,
+        'pin': pin and hasattr(os, "sched_setaffinity")
+    }
+
+def apply_threads(layout, worker_index=None):
+    """Apply a thread layout to the current process
+
+    worker_index selects the slice of cores a worker process is pinned to;
+    the main process is pinned to all of the planned cores.
+    """
+    torch.set_num_threads(layout['threads'])
+    try:
+        torch.set_num_interop_threads(layout['interop_threads'])
+    except RuntimeError:
+        pass  # Only allowed before the first parallel work in a process
+    cv2.setNumThreads(layout['opencv_threads'])
+
+    if layout['pin']:
+        cpus = layout['core_cpus']
+        if worker_index is not None:
+            start = (worker_index % layout['workers']) * layout['threads']
+            cpus = cpus[start:start + layout['threads']] or cpus
+        os.sched_setaffinity(0, cpus)
+
+def configure_threads(workers=1, threads=None, pin=False):
+    """Plan and apply thread budgets for this process and its worker processes
+
+    Returns the layout, which worker pools pass to apply_threads in each
+    worker, and which print_device_info reports.
+    """
+    global _thread_layout
+    _thread_layout = plan_threads(workers, threads, pin)
+    apply_threads(_thread_layout)
+    return _thread_layout
+
+def thread_layout(workers=1):
+    """The configured thread layout, or a default plan for `workers` processes"""
+    if _thread_layout is not None and _thread_layout['workers'] == workers:
+        return _thread_layout
+    return plan_threads(workers)
+
+def _cpu_ranges(cpus):
+    """Format CPU numbers compactly, e.g. 0-7,16-23"""
+    ranges = []
+    for cpu in cpus:
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
 def print_device_info(device):
     """Print information about the device being used"""
     print(f"Using device: {device}")
     if device == "cuda":
         print(f"CUDA Device: {torch.cuda.get_device_name(0)}")
     elif device == "mps":
-        print("Using MPS (Metal Performance Shaders)")
\ No newline at end of file
+        print("Using MPS (Metal Performance Shaders)")
+    if _thread_layout is not None:
+        layout = _thread_layout
+        print(f"CPU: {layout['physical_cores']} physical cores, {layout['logical_cpus']} logical CPUs")
+        print(f"Threads: {layout['workers']} process(es) x {layout['threads']} torch, "
+              f"{layout['interop_threads']} inter-op, {layout['opencv_threads']} OpenCV")
+        if layout['pin']:
+            print(f"Pinned to CPUs: {_cpu_ranges(layout['core_cpus'])}")
@@ -1,10 +1,19 @@
+import os
 from datetime import datetime
+from fnmatch import fnmatch
 from pathlib import Path
+import cv2
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm", ".flv", ".wmv", ".mpg", ".mpeg")
+
+# Folder that holds every run's timestamped output directory
+OUTPUT_ROOT = Path("output_results")
 
 def create_output_dir():
     """Create output directory with timestamp inside an 'output' folder"""
     # Create main output directory if it doesn't exist
-    main_output_dir = Path("output_results")
+    main_output_dir = OUTPUT_ROOT
     main_output_dir.mkdir(exist_ok=True)
     
     # Create timestamped subdirectory
@@ -13,7 +22,94 @@ def create_output_dir():
     output_dir.mkdir(exist_ok=True)
     return output_dir
 
-def get_image_files(folder_path):
+def iter_image_files(folder_path, recursive=False, include=None, exclude=None, extensions=IMAGE_EXTENSIONS,
+                     skip_dirs=None):
+    """Yield image files as a folder is scanned, without listing it all first
+
+    include and exclude are glob patterns matched against the path relative
+    to folder_path (e.g. "*.png" or "thumbs/*"). Subfolders matching an
+    exclude pattern are not descended into, and neither are skip_dirs
+    (e.g. the output folder when it lies inside the scanned one). Files of
+    one folder are yielded together before its subfolders are scanned.
+    """
+    folder_path = Path(folder_path)
+    skip_dirs = {Path(directory).resolve() for directory in skip_dirs or ()}
+    pending = [folder_path]
+    while pending:
+        directory = pending.pop()
+        subdirectories = []
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                relative = Path(entry.path).relative_to(folder_path).as_posix()
+                if exclude and any(fnmatch(relative, pattern) for pattern in exclude):
+                    continue
+                if entry.is_dir():
+                    if recursive and Path(entry.path).resolve() not in skip_dirs:
+                        subdirectories.append(Path(entry.path))
+                    continue
+                if os.path.splitext(entry.name)[1].lower() not in extensions:
+                    continue
+                if include and not any(fnmatch(relative, pattern) for pattern in include):
+                    continue
+                yield Path(entry.path)
+        pending.extend(sorted(subdirectories, reverse=True))
+
+def has_image_files(folder_path, **kwargs):
+    """Check whether a folder contains at least one image, stopping at the first one found"""
+    return next(iter_image_files(folder_path, **kwargs), None) is not None
+
+def get_image_files(folder_path, **kwargs):
     """Get all image files from a folder"""
-    image_extensions = (".jpg", ".jpeg", ".png")
-    return [f for f in folder_path.glob("*") if f.suffix.lower() in image_extensions] 
\ No newline at end of file
+    return list(iter_image_files(folder_path, **kwargs))
+
+def batched(items, size, group_by=None):
+    """Group a stream into lists of up to `size`, starting a new list whenever group_by(item) changes"""
+    batch = []
+    for item in items:
+        if batch and (len(batch) == size or (group_by is not None and group_by(item) != group_by(batch[-1]))):
+            yield batch
+            batch = []
+        batch.append(item)
+    if batch:
+        yield batch
+
+def mirrored_output_dir(output_dir, input_root, image_path):
+    """Output folder for an image that mirrors its subfolder under the input root"""
+    if input_root is None:
+        return output_dir
+    relative = Path(image_path).parent.relative_to(input_root)
+    if relative == Path("."):
+        return output_dir
+    mirrored = output_dir / relative
+    mirrored.mkdir(parents=True, exist_ok=True)
+    return mirrored
+
+def load_sample_images(path, count=1):
+    """Decode up to `count` sample images from an image file, a folder of images or a video"""
+    path = Path(path)
+    if path.is_dir():
+        files = iter_image_files(path)
+        samples = [cv2.imread(str(f)) for f, _ in zip(files, range(count))]
+        return [img for img in samples if img is not None]
+
+    if path.suffix.lower() in IMAGE_EXTENSIONS:
+        img = cv2.imread(str(path))
+        return [img] if img is not None else []
+
+    # Treat anything else as a video and spread the samples across it
+    cap = cv2.VideoCapture(str(path))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    samples = []
+    for i in range(count):
+        if total_frames > count:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, i * total_frames // count)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        samples.append(frame)
+    cap.release()
+    return samples
@@ -0,0 +1,103 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from PIL import Image
+from .profiling import stage
+
+# OpenCV decodes JPEGs at these fractions of full size directly, without decoding every pixel first
+_REDUCED_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+def reduction_factor(image_path, target_size):
+    """Largest of 8, 4 or 2 that keeps the image's longer side at or above target_size, else 1
+
+    Only the image header is read to get its size. Images too large for
+    Pillow to open at all get the largest reduction.
+    """
+    try:
+        with Image.open(image_path) as image:
+            longest = max(image.size)
+    except Image.DecompressionBombError:
+        return _REDUCED_FLAGS[0][0]
+    except OSError:
+        return 1
+    for factor, _ in _REDUCED_FLAGS:
+        if longest // factor >= target_size:
+            return factor
+    return 1
+
+def read_image(image_path, target_size=None):
+    """Decode an image, at reduced resolution when it is much larger than target_size
+
+    Returns (img, scale) where scale is the factor the image was reduced by,
+    so boxes found on it map back to the original with a multiplication.
+    img is None if the file could not be read.
+    """
+    factor = reduction_factor(image_path, target_size) if target_size else 1
+    with stage("decode"):
+        if factor == 1:
+            return cv2.imread(str(image_path)), 1
+        img = cv2.imread(str(image_path), dict(_REDUCED_FLAGS)[factor])
+    return img, factor
+
+class PrefetchLoader:
+    """Decode images on a thread pool ahead of the code that consumes them
+
+    Iterating yields (path, img, scale, cache_key) in input order. At most `prefetch`
+    images are decoded or queued ahead of the one being consumed, so memory
+    stays bounded however long the input is, and the input may be a stream
+    that is still being produced. OpenCV releases the GIL while decoding, so
+    decode time overlaps with inference on the consuming thread. With
+    target_size set, images much larger than the model input are decoded at
+    1/2, 1/4 or 1/8 resolution (see read_image).
+
+    With a DetectionCache, each file's cache key is computed on the pool too,
+    and images that are already cached are not decoded at all: they are
+    yielded with img None so the consumer restores them from the cache.
+    cache_key is None without a cache.
+    """
+
+    def __init__(self, image_paths, prefetch=8, workers=4, target_size=None, cache=None):
+        self.image_paths = image_paths
+        self.prefetch = max(1, prefetch)
+        self.workers = max(1, min(workers, self.prefetch))
+        self.target_size = target_size
+        self.cache = cache
+
+    def _load(self, path):
+        """Decode one image unless its result is already cached
+
+        Errors, e.g. a file removed since the scan, are left to the consumer,
+        which reads the image itself and reports them.
+        """
+        try:
+            cache_key = self.cache.key(path) if self.cache is not None else None
+            if cache_key is not None and self.cache.contains(cache_key):
+                return None, 1, cache_key
+            img, scale = read_image(path, self.target_size)
+            return img, scale, cache_key
+        except Exception:
+            return None, 1, None
+
+    def __iter__(self):
+        paths = iter(self.image_paths)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch") as pool:
+            try:
+                for path in paths:
+                    pending.append((path, pool.submit(self._load, path)))
+                    if len(pending) >= self.prefetch:
+                        break
+
+                while pending:
+                    path, future = pending.popleft()
+                    with stage("load_wait"):
+                        img, scale, cache_key = future.result()
+
+                    # Refill the slot before handing the image over
+                    next_path = next(paths, None)
+                    if next_path is not None:
+                        pending.append((next_path, pool.submit(self._load, next_path)))
+                    yield path, img, scale, cache_key
+            finally:
+                for _, future in pending:
+                    future.cancel()
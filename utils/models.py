@@ -0,0 +1,163 @@
+import shutil
+import time
+from pathlib import Path
+import torch
+from ultralytics import YOLO
+from .postprocess import match_detections, select_detections
+
+BACKENDS = ("torch", "onnx", "openvino")
+PRECISIONS = ("fp32", "bf16", "int8")
+DEFAULT_IMGSZ = 640
+
+def exported_model_path(model_path, backend, imgsz=DEFAULT_IMGSZ, int8=False):
+    """Path of the cached export for a model, keyed by model name, input size and precision"""
+    weights = Path(model_path)
+    stem = f"{weights.stem}_{imgsz}{'_int8' if int8 else ''}"
+    if backend == "onnx":
+        return weights.with_name(f"{stem}.onnx")
+    if backend == "openvino":
+        return weights.with_name(f"{stem}_openvino_model")
+    raise ValueError(f"Unsupported export backend: {backend}")
+
+def export_model(model_path, backend, imgsz=DEFAULT_IMGSZ, int8=False):
+    """Export a model for a CPU backend once and reuse the cached export afterwards
+
+    With int8=True the export is quantized to 8-bit integers after
+    calibrating on Ultralytics' default sample dataset (OpenVINO only).
+
+    Returns (export path, whether it was created by this call).
+    """
+    if int8 and backend != "openvino":
+        raise ValueError("int8 precision needs the openvino backend")
+    export_path = exported_model_path(model_path, backend, imgsz, int8)
+    if export_path.exists():
+        return export_path, False
+
+    print(f"Exporting {model_path} to {backend}{' int8' if int8 else ''} at {imgsz}px (one-time)...")
+    exported = Path(YOLO(model_path).export(format=backend, imgsz=imgsz, dynamic=True, int8=int8, verbose=False))
+
+    # Ultralytics names exports after the weights; move them to the keyed cache path
+    if exported != export_path:
+        if export_path.is_dir():
+            shutil.rmtree(export_path)
+        elif export_path.exists():
+            export_path.unlink()
+        shutil.move(str(exported), str(export_path))
+    return export_path, True
+
+def bf16_supported():
+    """Check whether the CPU runs bfloat16 natively (AVX512-BF16 or AMX) rather than emulating it"""
+    check = getattr(torch.ops.mkldnn, "_is_mkldnn_bf16_supported", None)
+    return bool(check is not None and check())
+
+def _to_float32(outputs):
+    """Cast the floating point tensors in a model output back to float32"""
+    if isinstance(outputs, torch.Tensor):
+        return outputs.float() if outputs.is_floating_point() else outputs
+    if isinstance(outputs, (list, tuple)):
+        return type(outputs)(_to_float32(output) for output in outputs)
+    return outputs
+
+def _autocast_bf16(model):
+    """Run a PyTorch model's forward pass under CPU bfloat16 autocast
+
+    Outputs are cast back to float32 so box decoding and NMS are unchanged.
+    """
+    module = model.model
+    forward = module.forward
+
+    def forward_bf16(*args, **kwargs):
+        with torch.autocast("cpu", dtype=torch.bfloat16):
+            outputs = forward(*args, **kwargs)
+        return _to_float32(outputs)
+
+    module.forward = forward_bf16
+
+def load_model(model_path, device, backend="torch", imgsz=None, precision="fp32"):
+    """Load a YOLOv8 model with logging disabled and move it to the device
+
+    For the "onnx" and "openvino" backends the model is exported once and
+    the cached export is loaded instead. Every backend returns an ultralytics
+    model object, so the same postprocessing and drawing code works with all
+    of them. imgsz sets the inference input size (default: 640).
+
+    precision="bf16" runs the PyTorch model under bfloat16 autocast on the
+    CPU, and precision="int8" loads an int8-quantized OpenVINO export.
+    """
+    if precision == "bf16" and (backend != "torch" or device != "cpu"):
+        raise ValueError("bf16 precision is only available for the torch backend on the CPU")
+
+    if backend == "torch":
+        if precision == "int8":
+            raise ValueError("int8 precision needs the openvino backend")
+        model = YOLO(model_path)
+        model.to(device)
+        if precision == "bf16":
+            _autocast_bf16(model)
+    else:
+        export_path, _ = export_model(model_path, backend, imgsz or DEFAULT_IMGSZ, int8=precision == "int8")
+        model = YOLO(str(export_path), task="detect")
+        model.overrides['device'] = "cuda" if backend == "onnx" and device == "cuda" else "cpu"
+    if imgsz is not None:
+        model.overrides['imgsz'] = imgsz
+    model.verbose = False  # Disable YOLO model logging
+    return model
+
+def compare_models(reference_model, candidate_model, images, iou_threshold=0.5):
+    """Run two models on the same images and measure how closely their detections agree
+
+    Every box is compared, not just the best per class. Returns the fraction
+    of reference boxes matched by a candidate box of the same class, the mean
+    IoU and confidence drift of the matches, and each model's total time.
+    """
+    totals = {'reference': 0, 'candidate': 0, 'matched': 0, 'iou': 0.0, 'conf_drift': 0.0, 'max_conf_drift': 0.0}
+    seconds = {'reference': 0.0, 'candidate': 0.0}
+    for image in images:
+        detections = {}
+        for name, model in (('reference', reference_model), ('candidate', candidate_model)):
+            start = time.perf_counter()
+            results = model(image, verbose=False)
+            seconds[name] += time.perf_counter() - start
+            detections[name] = select_detections(results[0], model.names, max_per_class=0)
+
+        match = match_detections(detections['reference'], detections['candidate'], iou_threshold)
+        totals['reference'] += len(detections['reference'])
+        totals['candidate'] += len(detections['candidate'])
+        totals['matched'] += match['matched']
+        totals['iou'] += match['iou_sum']
+        totals['conf_drift'] += match['conf_drift_sum']
+        totals['max_conf_drift'] = max(totals['max_conf_drift'], match['max_conf_drift'])
+
+    matched = totals['matched']
+    return {
+        'reference_boxes': totals['reference'],
+        'candidate_boxes': totals['candidate'],
+        'box_agreement': matched / totals['reference'] if totals['reference'] else 1.0,
+        'mean_iou': totals['iou'] / matched if matched else None,
+        'mean_conf_drift': totals['conf_drift'] / matched if matched else None,
+        'max_conf_drift': totals['max_conf_drift'],
+        'reference_seconds': seconds['reference'],
+        'candidate_seconds': seconds['candidate']
+    }
+
+def check_backend_parity(model_path, model, device, sample_images, imgsz=None):
+    """Compare an exported backend or reduced precision model against PyTorch fp32 and print the result
+
+    Both models are warmed up on the first sample before timing, so the
+    reported speedup compares steady-state inference.
+    """
+    reference = load_model(model_path, device, imgsz=imgsz)
+    for warm_model in (reference, model):
+        warm_model(sample_images[0], verbose=False)
+    stats = compare_models(reference, model, sample_images)
+    print(f"Parity check against torch fp32 on {len(sample_images)} samples:")
+    print(f"  - Boxes (torch fp32 / candidate): {stats['reference_boxes']} / {stats['candidate_boxes']}")
+    print(f"  - Box agreement: {stats['box_agreement']:.1%}")
+    if stats['mean_iou'] is not None:
+        print(f"  - Mean IoU of matched boxes: {stats['mean_iou']:.3f}")
+        print(f"  - Confidence drift: mean {stats['mean_conf_drift']:.4f}, max {stats['max_conf_drift']:.4f}")
+    if stats['candidate_seconds'] > 0:
+        print(f"  - Speedup: {stats['reference_seconds'] / stats['candidate_seconds']:.2f}x "
+              f"({stats['reference_seconds'] * 1000 / len(sample_images):.1f} -> "
+              f"{stats['candidate_seconds'] * 1000 / len(sample_images):.1f} ms per image)")
+    return stats
@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+from .profiling import stage
+
+def thumbnail(frame, size=(64, 36)):
+    """Downscaled grayscale copy of a frame used for cheap scene comparisons"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+class MotionGate:
+    """Skip the frame detector while the scene is static and reuse its last detections
+
+    Each frame is downscaled and compared against the frame the detector last
+    ran on. The detector only runs again once more than `threshold` percent of
+    the downscaled pixels changed by more than `pixel_delta` grey levels, so
+    small moving objects trigger it while sensor noise and compression
+    flicker, which downscaling averages away, do not. Comparing against the
+    last detected frame rather than the previous one means slow changes still
+    add up. max_skip forces a fresh detection after that many skipped frames.
+    """
+
+    def __init__(self, detect_fn, threshold=0.5, pixel_delta=25, size=(160, 90), max_skip=None):
+        self.detect_fn = detect_fn
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.size = size
+        self.max_skip = max_skip
+        self.reference = None
+        self.detections = []
+        self.skipped_since_detection = 0
+        self.skipped = 0
+        self.detector_calls = 0
+
+    def motion(self, small):
+        """Percentage of downscaled pixels that changed since the last detected frame"""
+        return float(np.count_nonzero(np.abs(small - self.reference) > self.pixel_delta)) * 100 / small.size
+
+    def __call__(self, frame):
+        with stage("motion"):
+            small = thumbnail(frame, self.size)
+            static = (self.reference is not None and self.motion(small) <= self.threshold and
+                      (self.max_skip is None or self.skipped_since_detection < self.max_skip))
+        if static:
+            self.skipped += 1
+            self.skipped_since_detection += 1
+            return self.detections
+
+        self.detections = self.detect_fn(frame)
+        self.detector_calls += 1
+        self.reference = small
+        self.skipped_since_detection = 0
+        return self.detections
@@ -0,0 +1,168 @@
+import queue
+import threading
+import time
+from pathlib import Path
+import cv2
+from tqdm import tqdm
+from .pipeline import _END, _StageError, _put
+from .postprocess import select_detections
+from .profiling import stage, record_model_speed
+from .processing import _read_frames
+from .video_writer import open_video_writer
+from .visualization import draw_detections
+
+class _Stream:
+    """One video source with its decoder thread, frame queue and output"""
+
+    def __init__(self, index, source, queue_size):
+        self.index = index
+        self.source = source
+        self.cap = cv2.VideoCapture(int(source) if source.isdigit() else source)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.size = (int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.out = None
+        self.frame_count = 0
+        self.finished = False
+        self.thread = None
+
+    def decode(self, ready, stop_event):
+        """Push decoded frames to the stream's queue, signalling `ready` after each one"""
+        try:
+            for frame in _read_frames(self.cap):
+                if not _put(self.frames, frame, stop_event):
+                    return
+                ready.set()
+        except Exception as e:
+            _put(self.frames, _StageError(e), stop_event)
+        else:
+            _put(self.frames, _END, stop_event)
+        ready.set()
+
+def _output_name(source, index, used):
+    """Name of the annotated output for a stream, unique within the run"""
+    path = Path(source)
+    name = f"processed_{path.name}" if path.is_file() else f"processed_stream{index}.mp4"
+    if name in used:
+        name = f"processed_{index}_{path.name}"
+    used.add(name)
+    return name
+
+def process_streams(model, sources, output_dir, max_per_class=1, render=True, detection_writer=None,
+                    batch_size=None, queue_size=4, writer_options=None):
+    """Process several videos or live sources at once with one shared model
+
+    Each source (a video file, a stream URL or a camera index) is decoded on
+    its own thread into a bounded queue of queue_size frames, raised to the
+    stream's share of a batch if that is larger. The calling thread takes
+    frames from the streams round-robin, at most one per stream per pass,
+    repeating passes until the batch holds batch_size frames (default: one
+    per stream) or no stream has a frame ready. Each batch goes through the
+    model in a single call, so only one copy of the model is loaded while
+    every stream keeps the batches full. Annotated outputs and detection
+    records are written per stream, in frame order, with video writers
+    opened from writer_options (see open_video_writer).
+
+    Returns a dict with the total number of frames, the elapsed seconds,
+    the total FPS across streams and the frames processed per source.
+    """
+    start_time = time.time()
+    batch_size = batch_size or len(sources)
+    queue_size = max(queue_size, -(-batch_size // len(sources)))
+    streams = [_Stream(index, str(source), queue_size) for index, source in enumerate(sources)]
+    used_names = set()
+    for stream in streams:
+        if not stream.cap.isOpened():
+            tqdm.write(f"Error: Could not open video source {stream.source}")
+            stream.finished = True
+            continue
+        if render:
+            output_path = output_dir / _output_name(stream.source, stream.index, used_names)
+            stream.out = open_video_writer(output_path, stream.fps, stream.size, **(writer_options or {}))
+        tqdm.write(f"  - Stream {stream.index}: {stream.source} ({stream.size[0]}x{stream.size[1]}, {stream.fps} FPS)")
+
+    ready = threading.Event()
+    stop_event = threading.Event()
+    for stream in streams:
+        if not stream.finished:
+            stream.thread = threading.Thread(target=stream.decode, args=(ready, stop_event), daemon=True)
+            stream.thread.start()
+
+    batches = 0
+    next_stream = 0
+    pbar = tqdm(desc=f"Processing {len(streams)} streams", unit="frames")
+    try:
+        while not all(stream.finished for stream in streams):
+            # Clear before scanning, so a frame queued during the scan still wakes the wait below
+            ready.clear()
+            batch = []
+            # Keep passing over the streams until the batch is full or no stream has a frame ready
+            took_frame = True
+            while took_frame and len(batch) < batch_size:
+                took_frame = False
+                for offset in range(len(streams)):
+                    if len(batch) == batch_size:
+                        break
+                    stream = streams[(next_stream + offset) % len(streams)]
+                    if stream.finished:
+                        continue
+                    try:
+                        item = stream.frames.get_nowait()
+                    except queue.Empty:
+                        continue
+                    if item is _END or isinstance(item, _StageError):
+                        if isinstance(item, _StageError):
+                            tqdm.write(f"Error reading video source {stream.source}: {str(item.error)}")
+                        stream.finished = True
+                        continue
+                    batch.append((stream, item))
+                    took_frame = True
+            if not batch:
+                ready.wait(timeout=0.1)
+                continue
+            # Start the next pass after the last stream served, so no stream is favoured
+            next_stream = (batch[-1][0].index + 1) % len(streams)
+
+            with stage("inference"):
+                results = model([frame for _, frame in batch], verbose=False)
+            record_model_speed(results)
+            batches += 1
+
+            for (stream, frame), result in zip(batch, results):
+                with stage("select"):
+                    detections = select_detections(result, model.names, max_per_class)
+                if detection_writer is not None:
+                    detection_writer.write(stream.source, detections, frame_index=stream.frame_count,
+                                           timestamp=stream.frame_count / stream.fps)
+                if stream.out is not None:
+                    draw_detections(frame, detections)
+                    with stage("encode"):
+                        stream.out.write(frame)
+                stream.frame_count += 1
+            pbar.update(len(batch))
+    except KeyboardInterrupt:
+        tqdm.write("\nStopping streams")
+    finally:
+        pbar.close()
+        stop_event.set()
+        for stream in streams:
+            if stream.thread is not None:
+                stream.thread.join()
+            stream.cap.release()
+            if stream.out is not None:
+                stream.out.release()
+
+    elapsed = time.time() - start_time
+    total_frames = sum(stream.frame_count for stream in streams)
+    tqdm.write(f"\nStream processing completed:")
+    tqdm.write(f"  - Time taken: {elapsed:.2f} seconds")
+    tqdm.write(f"  - Frames processed: {total_frames} in {batches} batches")
+    tqdm.write(f"  - Total FPS across streams: {total_frames/elapsed:.2f}")
+    for stream in streams:
+        tqdm.write(f"  - {stream.source}: {stream.frame_count} frames")
+    return {
+        'frames': total_frames,
+        'seconds': elapsed,
+        'fps': total_frames / elapsed,
+        'stream_frames': {stream.source: stream.frame_count for stream in streams}
+    }
@@ -0,0 +1,291 @@
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import multiprocessing
+import cv2
+from tqdm import tqdm
+from .device import apply_threads, thread_layout
+from .file_utils import batched, mirrored_output_dir
+from .models import load_model
+from .processing import (process_image, process_images_batch, process_video_range, _concat_segments,
+                         _segment_path)
+from .profiling import stage, timings
+
+# Model and detection cache set up once per worker process by _init_worker
+_worker_model = None
+_worker_cache = None
+
+def _init_worker(model_path, device, layout, worker_counter, model_options, cache=None):
+    """Apply the worker's share of the thread layout and load its copy of the model
+
+    The cache is kept for the worker's lifetime, so it only counts the size
+    of the cache directory once instead of once per shard.
+    """
+    global _worker_model, _worker_cache
+    with worker_counter.get_lock():
+        worker_index = worker_counter.value
+        worker_counter.value += 1
+    apply_threads(layout, worker_index)
+    _worker_model = load_model(model_path, device, **model_options)
+    _worker_cache = cache
+
+def _process_shard(image_paths, output_dir, max_per_class, batch_size, render, tile_options, input_root,
+                   decode_size):
+    """Process a shard of images with the worker's model
+
+    Returns a dict of detections per processed image, the number of cache
+    hits and the worker's stage timings for the shard.
+    """
+    processed = {}
+    cache = _worker_cache
+    cache_hits = cache.hits if cache is not None else 0
+    if batch_size > 1 and not tile_options:
+        group_by = (lambda path: path.parent) if input_root is not None else None
+        for batch in batched(image_paths, batch_size, group_by):
+            processed.update(process_images_batch(_worker_model, batch,
+                                                  mirrored_output_dir(output_dir, input_root, batch[0]),
+                                                  max_per_class=max_per_class, verbose=False, cache=cache,
+                                                  render=render, decode_size=decode_size))
+    else:
+        for image_path in image_paths:
+            detections = process_image(_worker_model, image_path,
+                                       mirrored_output_dir(output_dir, input_root, image_path),
+                                       max_per_class=max_per_class, verbose=False, cache=cache,
+                                       render=render, decode_size=decode_size, **tile_options)
+            if detections is not None:
+                processed[image_path] = detections
+
+    if cache is not None:
+        cache_hits = cache.hits - cache_hits
+    return processed, cache_hits, timings.drain()
+
+def _process_video_range(video_path, start, end, segment_path, max_per_class, detect_every, motion_threshold,
+                         writer_options):
+    """Process a frame range of a video with the worker's model
+
+    Returns the detections of each frame and the worker's stage timings for
+    the range.
+    """
+    range_detections = process_video_range(_worker_model, video_path, start, end, segment_path,
+                                           max_per_class=max_per_class, detect_every=detect_every,
+                                           motion_threshold=motion_threshold, writer_options=writer_options)
+    return range_detections, timings.drain()
+
+def process_folder_parallel(model_path, device, image_files, output_dir, workers,
+                            max_per_class=1, batch_size=1, shard_size=None, cache=None,
+                            render=True, detection_writer=None, model_options=None, tile_options=None,
+                            input_root=None, checkpoint=None, decode_size=None):
+    """Process images across a pool of worker processes, each with one warm model
+
+    The files, a list or a stream that is still being scanned, are split
+    into small shards that are handed out as workers become free, and
+    every worker gets an equal share of the physical cores (see
+    configure_threads) so the pools do not oversubscribe them. Detection
+    records are written by the parent process as shards complete.
+    model_options are passed to load_model in each worker (e.g. backend and
+    imgsz), and tile_options to process_image for tiled detection. Workers decode images much larger
+    than decode_size at reduced resolution (see read_image). With
+    input_root set, outputs mirror the subfolders of the images under it.
+    With a RunManifest as checkpoint, the files of each shard are recorded
+    in it once the shard completes.
+    """
+    layout = thread_layout(workers)
+    num_threads = layout['threads']
+    shard_size = shard_size or max(batch_size, 8)
+    shards = batched(image_files, shard_size)
+    total = len(image_files) if isinstance(image_files, (list, tuple)) else None
+
+    start_time = time.time()
+    processed = failed = objects = cache_hits = 0
+
+    # Spawn fresh interpreters so CUDA and torch thread pools are not inherited
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(model_path, device, layout, context.Value('i', 0), model_options or {},
+                                       cache)) as executor:
+        with tqdm(total=total, desc=f"Processing images ({workers} workers)") as pbar:
+            # Keep a couple of shards queued per worker so results stream back steadily
+            pending = {}
+            shard_iter = iter(shards)
+            for shard in shard_iter:
+                pending[executor.submit(_process_shard, shard, output_dir, max_per_class, batch_size,
+                                        render, tile_options or {}, input_root, decode_size)] = shard
+                if len(pending) >= workers * 2:
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    shard = pending.pop(future)
+                    shard_length = len(shard)
+                    try:
+                        shard_results, shard_hits, shard_timings = future.result()
+                        timings.merge(shard_timings)
+                        worker_failed = False
+                    except Exception as e:
+                        tqdm.write(f"Error in worker: {str(e)}")
+                        shard_results, shard_hits = {}, 0
+                        worker_failed = True
+                    processed += len(shard_results)
+                    failed += shard_length - len(shard_results)
+                    cache_hits += shard_hits
+                    for image_path, detections in shard_results.items():
+                        objects += len(detections)
+                        if detection_writer is not None:
+                            detection_writer.write(image_path, detections)
+                    if checkpoint is not None and not worker_failed:
+                        checkpoint.mark_files(shard, detection_writer)
+                    pbar.update(shard_length)
+
+                    next_shard = next(shard_iter, None)
+                    if next_shard is not None:
+                        pending[executor.submit(_process_shard, next_shard, output_dir,
+                                                max_per_class, batch_size, render,
+                                                tile_options or {}, input_root, decode_size)] = next_shard
+
+    elapsed = time.time() - start_time
+    tqdm.write(f"\nFolder processing completed:")
+    tqdm.write(f"  - Workers: {workers} ({num_threads} threads each)")
+    tqdm.write(f"  - Images processed: {processed}")
+    tqdm.write(f"  - Images failed: {failed}")
+    tqdm.write(f"  - Objects detected: {objects}")
+    if cache is not None:
+        tqdm.write(f"  - Cache hits: {cache_hits}")
+    tqdm.write(f"  - Images per second: {processed/elapsed:.2f}")
+    return processed, failed, objects
+
+def process_video_parallel(model_path, device, video_path, output_dir, workers, max_per_class=1,
+                           detect_every=1, motion_threshold=None, render=True, detection_writer=None,
+                           model_options=None, chunk_seconds=None, checkpoint=None, writer_options=None):
+    """Process one video in frame ranges across a pool of worker processes
+
+    The video is split into chunks of chunk_seconds (default: four chunks
+    per worker so fast workers pick up the slack), and each chunk is
+    decoded, detected and encoded by a worker with its own model and its
+    own seek into the video. The tracker and motion gate restart at every
+    chunk. Annotated chunks are joined into one video at the end, and
+    detection records are written by the parent process in frame order as
+    the chunks complete. writer_options configure each worker's video
+    encoder (see open_video_writer). With a RunManifest as checkpoint, chunks are
+    recorded as segments once their records are written, and chunks
+    recorded by an interrupted run are skipped.
+
+    Returns a dict with the number of frames processed, the elapsed seconds
+    and the average FPS, or None if the video could not be processed.
+    """
+    start_time = time.time()
+    try:
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            tqdm.write(f"Error: Could not open video {video_path}")
+            return
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        if checkpoint is not None and checkpoint.complete:
+            tqdm.write(f"\nSkipping video {video_path.name}: already completed")
+            return {'frames': 0, 'seconds': 0.0, 'fps': 0.0}
+
+        # Split the video into frame ranges; the last one runs to the real end of the video
+        if chunk_seconds:
+            chunk_frames = max(1, round(chunk_seconds * fps))
+        else:
+            chunk_frames = max(1, math.ceil(total_frames / (workers * 4)))
+        chunk_count = max(1, math.ceil(total_frames / chunk_frames))
+        ranges = [(index * chunk_frames, (index + 1) * chunk_frames if index < chunk_count - 1 else None)
+                  for index in range(chunk_count)]
+
+        # Chunks recorded by an interrupted run are always a prefix, since records are written in order
+        next_index = 0
+        frame_count = 0
+        chunk_lengths = {}
+        while checkpoint is not None and next_index in checkpoint.segments:
+            chunk_lengths[next_index] = checkpoint.segments[next_index]
+            frame_count += chunk_lengths[next_index]
+            next_index += 1
+        resumed_frames = frame_count
+
+        output_path = output_dir / f"processed_{video_path.name}" if render else None
+        if render:
+            (output_dir / "segments").mkdir(exist_ok=True)
+
+        layout = thread_layout(workers)
+        num_threads = layout['threads']
+        tqdm.write(f"\nProcessing video: {video_path.name}")
+        tqdm.write(f"  - Resolution: {width}x{height}")
+        tqdm.write(f"  - FPS: {fps}")
+        tqdm.write(f"  - Total frames: {total_frames}")
+        tqdm.write(f"  - Chunks: {chunk_count} of {chunk_frames} frames")
+
+        completed = {}
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(model_path, device, layout, context.Value('i', 0), model_options or {})) as executor:
+            futures = {}
+            for index in range(next_index, chunk_count):
+                start, end = ranges[index]
+                segment_path = _segment_path(output_dir, video_path, index) if render else None
+                futures[executor.submit(_process_video_range, video_path, start, end, segment_path,
+                                        max_per_class, detect_every, motion_threshold, writer_options)] = index
+
+            with tqdm(total=total_frames, initial=frame_count, desc=f"Processing video ({workers} workers)",
+                      unit="frames") as pbar:
+                try:
+                    for future in as_completed(futures):
+                        range_detections, range_timings = future.result()
+                        timings.merge(range_timings)
+                        completed[futures[future]] = range_detections
+                        pbar.update(len(range_detections))
+
+                        # Write the records of every chunk that is now next in frame order
+                        while next_index in completed:
+                            range_detections = completed.pop(next_index)
+                            chunk_lengths[next_index] = len(range_detections)
+                            if detection_writer is not None:
+                                for detections in range_detections:
+                                    detection_writer.write(video_path, detections, frame_index=frame_count,
+                                                           timestamp=frame_count / fps if fps else None)
+                                    frame_count += 1
+                            else:
+                                frame_count += len(range_detections)
+                            if checkpoint is not None:
+                                checkpoint.mark_segment(next_index, len(range_detections), detection_writer)
+                            next_index += 1
+                except BaseException:
+                    # Finished chunks stay on disk for a resumed run
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+        # Join the annotated chunks; missing ones mean an earlier run already joined them
+        segment_paths = []
+        if render:
+            segment_paths = [_segment_path(output_dir, video_path, index)
+                             for index in range(chunk_count) if chunk_lengths[index]]
+        if segment_paths and all(path.exists() for path in segment_paths):
+            with stage("concat"):
+                _concat_segments(segment_paths, output_path, fps, (width, height))
+        if checkpoint is not None:
+            checkpoint.mark_complete(detection_writer)
+        for path in segment_paths:
+            path.unlink(missing_ok=True)
+        if render and not any((output_dir / "segments").iterdir()):
+            (output_dir / "segments").rmdir()
+
+        elapsed = time.time() - start_time
+        processed = frame_count - resumed_frames
+        tqdm.write(f"\nVideo processing completed:")
+        tqdm.write(f"  - Workers: {workers} ({num_threads} threads each)")
+        tqdm.write(f"  - Time taken: {elapsed:.2f} seconds")
+        tqdm.write(f"  - Average FPS: {processed/elapsed:.2f}")
+        if resumed_frames:
+            tqdm.write(f"  - Resumed after {resumed_frames} frames from an earlier run")
+        if output_path is not None:
+            tqdm.write(f"  - Saved to: {output_path}")
+        return {'frames': processed, 'seconds': elapsed, 'fps': processed / elapsed}
+
+    except Exception as e:
+        tqdm.write(f"Error processing video {video_path}: {str(e)}")
@@ -0,0 +1,88 @@
+import queue
+import threading
+
+# Marker passed down the queues once the source is exhausted
+_END = object()
+
+class _StageError:
+    """Wraps an exception raised inside a pipeline stage"""
+    def __init__(self, error):
+        self.error = error
+
+def _put(stage_queue, item, stop_event):
+    """Put an item on a queue, giving up if the pipeline is being stopped"""
+    while not stop_event.is_set():
+        try:
+            stage_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(stage_queue, stop_event):
+    """Get an item from a queue, returning the end marker if the pipeline is being stopped"""
+    while not stop_event.is_set():
+        try:
+            return stage_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _END
+
+def _decode_stage(frames, decoded_queue, stop_event):
+    """Pull frames from the source and push them to the inference stage"""
+    try:
+        for frame in frames:
+            if not _put(decoded_queue, frame, stop_event):
+                return
+    except Exception as e:
+        _put(decoded_queue, _StageError(e), stop_event)
+        return
+    _put(decoded_queue, _END, stop_event)
+
+def _infer_stage(detect_fn, decoded_queue, inferred_queue, stop_event):
+    """Run detection on decoded frames and push them to the output stage"""
+    while True:
+        item = _get(decoded_queue, stop_event)
+        if item is _END or isinstance(item, _StageError):
+            _put(inferred_queue, item, stop_event)
+            return
+        try:
+            detections = detect_fn(item)
+        except Exception as e:
+            _put(inferred_queue, _StageError(e), stop_event)
+            return
+        if not _put(inferred_queue, (item, detections), stop_event):
+            return
+
+def run_pipelined(frames, detect_fn, queue_size=8):
+    """Yield (frame, detections) pairs in order, decoding and detecting on background threads
+
+    Decoding and inference each run on their own thread and are connected by
+    bounded queues, so the caller can annotate and encode frame N while frame
+    N+1 is in the model and frame N+2 is being decoded. Each stage is a single
+    thread, so frames come out in the order they went in.
+    """
+    stop_event = threading.Event()
+    decoded_queue = queue.Queue(maxsize=queue_size)
+    inferred_queue = queue.Queue(maxsize=queue_size)
+
+    threads = [
+        threading.Thread(target=_decode_stage, args=(frames, decoded_queue, stop_event), daemon=True),
+        threading.Thread(target=_infer_stage, args=(detect_fn, decoded_queue, inferred_queue, stop_event), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = inferred_queue.get()
+            if item is _END:
+                break
+            if isinstance(item, _StageError):
+                raise item.error
+            yield item
+    finally:
+        # Stop the background stages before the caller releases the source
+        stop_event.set()
+        for thread in threads:
+            thread.join()
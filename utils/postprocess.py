@@ -0,0 +1,127 @@
+import numpy as np
+
+def extract_boxes(result):
+    """Move box coordinates, class ids and confidences off the device in one transfer
+
+    Returns (xyxy, cls, conf) arrays of shape (N, 4), (N,) and (N,).
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return (np.zeros((0, 4), dtype=np.float32),
+                np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=np.float32))
+
+    # boxes.data is laid out as [x1, y1, x2, y2, (track id,) conf, cls]
+    data = boxes.cpu().numpy().data
+    return data[:, :4], data[:, -1].astype(np.int64), data[:, -2]
+
+def top_per_class(cls, conf, max_per_class=1):
+    """Return indices of the max_per_class highest confidence boxes of each class
+
+    A max_per_class of 0 or less keeps every box. Classes are returned in the
+    order they first appear in the input, and boxes within a class from the
+    highest to the lowest confidence, so the default of 1 reproduces the
+    "first highest confidence box per class" selection.
+    """
+    if len(cls) == 0:
+        return np.zeros(0, dtype=np.int64)
+    if max_per_class <= 0:
+        return np.arange(len(cls))
+
+    # Sort by class, then by descending confidence (stable, so ties keep input order)
+    order = np.lexsort((-conf, cls))
+    sorted_cls = cls[order]
+
+    # Rank of each box within its class
+    group_starts = np.flatnonzero(np.r_[True, sorted_cls[1:] != sorted_cls[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, len(order)])
+    rank = np.arange(len(order)) - np.repeat(group_starts, group_sizes)
+
+    # Order classes by where they first appear in the input
+    first_index = np.repeat(np.minimum.reduceat(order, group_starts), group_sizes)
+
+    keep = rank < max_per_class
+    return order[keep][np.lexsort((rank[keep], first_index[keep]))]
+
+def to_detections(xyxy, cls, conf, names):
+    """Convert box arrays into a list of detection dicts"""
+    return [
+        {
+            'class_id': class_id,
+            'class_name': names[class_id],
+            'box': tuple(box),
+            'conf': score
+        }
+        for box, class_id, score in zip(xyxy.tolist(), cls.tolist(), conf.tolist())
+    ]
+
+def scale_detections(detections, factor):
+    """Scale detection boxes, e.g. back to full resolution from a reduced decode"""
+    return [{**detection, 'box': tuple(value * factor for value in detection['box'])}
+            for detection in detections]
+
+def select_detections(result, names, max_per_class=1):
+    """Select the detections to keep from a single model result
+
+    max_per_class=1 keeps only the highest confidence box for each class,
+    a larger value keeps the top-k boxes per class and 0 keeps all boxes.
+    """
+    xyxy, cls, conf = extract_boxes(result)
+    keep = top_per_class(cls, conf, max_per_class)
+    return to_detections(xyxy[keep], cls[keep], conf[keep], names)
+
+def box_iou(boxes_a, boxes_b):
+    """Pairwise IoU between two sets of xyxy boxes, shape (len(boxes_a), len(boxes_b))"""
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-9)
+
+def greedy_matches(iou, iou_threshold):
+    """Pair rows and columns of an IoU matrix greedily from the highest IoU down
+
+    Returns a list of (row, column) pairs, each row and column used at most once.
+    """
+    matches = []
+    used_rows = set()
+    used_columns = set()
+    for flat_index in np.argsort(-iou, axis=None):
+        row, column = np.unravel_index(flat_index, iou.shape)
+        if iou[row, column] < iou_threshold:
+            break
+        if row in used_rows or column in used_columns:
+            continue
+        matches.append((row, column))
+        used_rows.add(row)
+        used_columns.add(column)
+    return matches
+
+def match_detections(reference, candidate, iou_threshold=0.5):
+    """Greedily match two lists of detections by class and IoU
+
+    Returns the number of matches with the sum of their IoU, the sum and
+    maximum of their absolute confidence differences.
+    """
+    stats = {'matched': 0, 'iou_sum': 0.0, 'conf_drift_sum': 0.0, 'max_conf_drift': 0.0}
+    if not reference or not candidate:
+        return stats
+
+    iou = box_iou([detection['box'] for detection in reference], [detection['box'] for detection in candidate])
+    reference_classes = np.array([detection['class_id'] for detection in reference])
+    candidate_classes = np.array([detection['class_id'] for detection in candidate])
+    iou[reference_classes[:, None] != candidate_classes[None, :]] = 0
+
+    for i, j in greedy_matches(iou, iou_threshold):
+        drift = abs(reference[i]['conf'] - candidate[j]['conf'])
+        stats['matched'] += 1
+        stats['iou_sum'] += float(iou[i, j])
+        stats['conf_drift_sum'] += drift
+        stats['max_conf_drift'] = max(stats['max_conf_drift'], drift)
+    return stats
@@ -1,66 +1,380 @@
+import os
+import shutil
+import subprocess
 import time
 import cv2
+from contextlib import closing
+from functools import partial
+from itertools import islice
 from pathlib import Path
 from tqdm import tqdm
-from .visualization import draw_detection
+from .loader import read_image
+from .motion import MotionGate
+from .pipeline import run_pipelined
+from .postprocess import scale_detections, select_detections, top_per_class, to_detections
+from .profiling import stage, record_model_speed
+from .tiling import detect_tiled
+from .tracking import KeyframeDetector
+from .video_writer import open_video_writer
+from .visualization import draw_detections
 
-def process_image(model, image_path, output_dir):
-    """Process a single image and save the result"""
+def _save_annotated_image(img, detections, image_path, output_dir):
+    """Draw the selected detections on an image and save it"""
+    draw_detections(img, detections)
+
+    # Save processed image
+    output_path = _output_path(image_path, output_dir)
+    with stage("encode"):
+        cv2.imwrite(str(output_path), img)
+    return output_path
+
+def _output_path(image_path, output_dir):
+    """Path of the processed output for an input image"""
+    return output_dir / f"processed_{image_path.name}"
+
+def _restore_cached(cache, cache_key, image_path, output_dir, render=True, detection_writer=None):
+    """Write a cached result straight to the output directory
+
+    Returns the cached detections, or None on a cache miss.
+    """
+    cached = cache.get(cache_key)
+    if cached is None:
+        return None
+    detections, output_bytes = cached
+    if render:
+        if output_bytes is None:
+            return None
+        _output_path(image_path, output_dir).write_bytes(output_bytes)
+    if detection_writer is not None:
+        detection_writer.write(image_path, detections)
+    return detections
+
+def _finish_image(img, detections, image_path, output_dir, render=True, cache=None, cache_key=None,
+                  detection_writer=None, img_scale=1):
+    """Save the outputs for a processed image
+
+    img_scale is the factor img was reduced by when decoding. The annotated
+    image is saved at the decoded size, while the returned, cached and
+    recorded detections are scaled back to the original resolution.
+
+    Returns the path of the annotated image, or None when rendering is off,
+    and the detections in original image coordinates.
+    """
+    output_path = None
+    if render:
+        output_path = _save_annotated_image(img, detections, image_path, output_dir)
+    if img_scale != 1:
+        detections = scale_detections(detections, img_scale)
+    if cache is not None:
+        cache.put(cache_key, detections, output_path.read_bytes() if render else None)
+    if detection_writer is not None:
+        detection_writer.write(image_path, detections)
+    return output_path, detections
+
+def process_image(model, image_path, output_dir, max_per_class=1, verbose=True, cache=None,
+                  render=True, detection_writer=None, tile_size=None, tile_overlap=0.2, img=None, img_scale=1,
+                  decode_size=None, cache_key=None):
+    """Process a single image and save the result
+
+    Returns the list of detections drawn on the image, or None if the image
+    could not be processed. When a DetectionCache is given, identical inputs
+    seen before are written straight from the cache without running the model.
+
+    With render=False no annotated image is drawn or saved, and the
+    detections are only returned and recorded by the detection_writer.
+
+    With tile_size set, the image is split into overlapping tiles of that
+    size which are detected at full resolution and merged, so small objects
+    in very large images are not lost to downscaling.
+
+    img is an already decoded copy of the image, e.g. from a PrefetchLoader,
+    reduced by img_scale; when it is None the image is read from image_path,
+    at reduced resolution when it is much larger than decode_size (see
+    read_image). cache_key is the image's key in the cache when it was
+    already computed, e.g. by a PrefetchLoader.
+    """
     try:
         # Start timing for this image
         image_start_time = time.time()
         
-        # Read image
-        img = cv2.imread(str(image_path))
+        # Reuse the stored result if this exact image was processed before
+        if cache is not None:
+            cache_key = cache_key or cache.key(image_path)
+            detections = _restore_cached(cache, cache_key, image_path, output_dir, render, detection_writer)
+            if detections is not None:
+                if verbose:
+                    tqdm.write(f"\nProcessed {image_path.name} (cached):")
+                    tqdm.write(f"  - Objects detected: {len(detections)}")
+                    if render:
+                        tqdm.write(f"  - Saved to: {_output_path(image_path, output_dir)}")
+                return detections
+        
+        # Read image unless it was decoded ahead of time
+        if img is None:
+            img, img_scale = read_image(image_path, decode_size)
         if img is None:
             tqdm.write(f"Error: Could not read image {image_path}")
             return
 
-        # Perform detection
-        results = model(img, verbose=False)
-        
-        # Track highest confidence detections for each class
-        class_detections = {}
-        
-        # Process all detections
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                
-                # Get class name and confidence
-                cls = int(box.cls[0].cpu().numpy())
-                conf = float(box.conf[0].cpu().numpy())
-                class_name = model.names[cls]
-                
-                # Update if this is the highest confidence detection for this class
-                if class_name not in class_detections or conf > class_detections[class_name]['conf']:
-                    class_detections[class_name] = {
-                        'box': (x1, y1, x2, y2),
-                        'conf': conf
-                    }
-        
-        # Draw only the highest confidence detection for each class
-        for class_name, detection in class_detections.items():
-            draw_detection(img, detection['box'], class_name, detection['conf'])
+        if tile_size:
+            # Detect on overlapping tiles and keep the best merged detections per class
+            xyxy, cls, conf = detect_tiled(model, img, tile_size, tile_overlap)
+            with stage("select"):
+                keep = top_per_class(cls, conf, max_per_class)
+                detections = to_detections(xyxy[keep], cls[keep], conf[keep], model.names)
+        else:
+            # Perform detection
+            with stage("inference"):
+                results = model(img, verbose=False)
+            record_model_speed(results)
 
-        # Save processed image
-        output_path = output_dir / f"processed_{image_path.name}"
-        cv2.imwrite(str(output_path), img)
+            # Keep the highest confidence detections for each class
+            with stage("select"):
+                detections = select_detections(results[0], model.names, max_per_class)
+        
+        # Draw detections and save processed image and records
+        output_path, detections = _finish_image(img, detections, image_path, output_dir, render,
+                                                cache, cache_key, detection_writer, img_scale)
         
         # Calculate and print processing time for this image
         image_processing_time = time.time() - image_start_time
-        tqdm.write(f"\nProcessed {image_path.name}:")
-        tqdm.write(f"  - Time taken: {image_processing_time:.2f} seconds")
-        tqdm.write(f"  - Objects detected: {len(class_detections)}")
-        tqdm.write(f"  - Saved to: {output_path}")
+        if verbose:
+            tqdm.write(f"\nProcessed {image_path.name}:")
+            tqdm.write(f"  - Time taken: {image_processing_time:.2f} seconds")
+            tqdm.write(f"  - Objects detected: {len(detections)}")
+            if output_path is not None:
+                tqdm.write(f"  - Saved to: {output_path}")
+        return detections
         
     except Exception as e:
         tqdm.write(f"Error processing image {image_path}: {str(e)}")
 
-def process_video(model, video_path, output_dir, progress_bar=True):
-    """Process a video file and save the result"""
+def process_images_batch(model, image_paths, output_dir, max_per_class=1, verbose=True, cache=None,
+                         render=True, detection_writer=None, images=None, decode_size=None):
+    """Process a batch of images with a single model call and save the results
+
+    Returns a dict mapping each successfully processed image path to its
+    list of detections. Images found in the cache are restored from it and
+    left out of the model call. images optionally holds the already decoded
+    (img, scale, cache_key) of each path, as yielded by a PrefetchLoader,
+    where img may be None for a cached image; other images are read here,
+    reduced towards decode_size if set.
+    """
+    processed = {}
+    try:
+        # Start timing for this batch
+        batch_start_time = time.time()
+        
+        # Read images, skipping any that cannot be decoded or are already cached
+        batch_paths = []
+        batch_images = []
+        batch_scales = []
+        cache_keys = {}
+        for i, image_path in enumerate(image_paths):
+            img, scale, cache_key = images[i] if images is not None else (None, 1, None)
+            if cache is not None:
+                cache_keys[image_path] = cache_key or cache.key(image_path)
+                detections = _restore_cached(cache, cache_keys[image_path], image_path, output_dir,
+                                             render, detection_writer)
+                if detections is not None:
+                    processed[image_path] = detections
+                    continue
+            if img is None:
+                img, scale = read_image(image_path, decode_size)
+            if img is None:
+                tqdm.write(f"Error: Could not read image {image_path}")
+                continue
+            batch_paths.append(image_path)
+            batch_images.append(img)
+            batch_scales.append(scale)
+
+        if not batch_images:
+            return processed
+
+        # Perform detection on the whole batch in one forward pass
+        with stage("inference"):
+            results = model(batch_images, verbose=False)
+        record_model_speed(results)
+        
+        # Split the results back per image for drawing and saving
+        for image_path, img, scale, result in zip(batch_paths, batch_images, batch_scales, results):
+            with stage("select"):
+                detections = select_detections(result, model.names, max_per_class)
+            output_path, detections = _finish_image(img, detections, image_path, output_dir, render,
+                                                    cache, cache_keys.get(image_path), detection_writer, scale)
+            processed[image_path] = detections
+            if verbose:
+                tqdm.write(f"\nProcessed {image_path.name}:")
+                tqdm.write(f"  - Objects detected: {len(detections)}")
+                if output_path is not None:
+                    tqdm.write(f"  - Saved to: {output_path}")
+        
+        # Calculate and print processing time for this batch
+        batch_processing_time = time.time() - batch_start_time
+        if verbose:
+            tqdm.write(f"\nProcessed batch of {len(batch_images)} images:")
+            tqdm.write(f"  - Time taken: {batch_processing_time:.2f} seconds")
+            tqdm.write(f"  - Images per second: {len(batch_images)/batch_processing_time:.2f}")
+        
+    except Exception as e:
+        tqdm.write(f"Error processing batch starting at {image_paths[0]}: {str(e)}")
+    return processed
+
+def _read_frames(cap):
+    """Yield frames from an open video capture until it is exhausted"""
+    while cap.isOpened():
+        with stage("decode"):
+            ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame
+
+def _detect_frame(model, frame, max_per_class=1):
+    """Run detection on a single frame and keep the best detections per class"""
+    with stage("inference"):
+        results = model(frame, verbose=False)
+    record_model_speed(results)
+    with stage("select"):
+        return select_detections(results[0], model.names, max_per_class)
+
+def _build_detector(model, max_per_class=1, detect_every=1, motion_threshold=None):
+    """Chain the frame detector with the optional keyframe tracker and motion gate
+
+    Returns the detect function and the KeyframeDetector and MotionGate in
+    the chain, each None when it is not used.
+    """
+    detect_fn = partial(_detect_frame, model, max_per_class=max_per_class)
+    keyframe_detector = None
+    if detect_every > 1:
+        detect_fn = keyframe_detector = KeyframeDetector(detect_fn, detect_every)
+    motion_gate = None
+    if motion_threshold is not None:
+        detect_fn = motion_gate = MotionGate(detect_fn, motion_threshold)
+    return detect_fn, keyframe_detector, motion_gate
+
+def _release_quietly(out):
+    """Release a video writer that is being abandoned after an error"""
+    try:
+        out.release()
+    except Exception:
+        pass
+
+def _segment_path(output_dir, video_path, index, partial=False):
+    """Path of one segment of a checkpointed video output"""
+    suffix = ".partial" if partial else ""
+    return output_dir / "segments" / f"{video_path.stem}_{index:05d}{suffix}{video_path.suffix}"
+
+def _concat_segments(segment_paths, output_path, fps, size):
+    """Join video segments into one file, without re-encoding when ffmpeg is installed"""
+    if len(segment_paths) == 1:
+        os.replace(segment_paths[0], output_path)
+        return
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_path = output_path.with_name(output_path.name + ".segments.txt")
+        list_path.write_text("".join("file '{}'\n".format(str(path.resolve()).replace("'", "'\\''"))
+                                     for path in segment_paths))
+        subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                        "-i", str(list_path), "-c", "copy", str(output_path)], check=True)
+        list_path.unlink()
+        return
+
+    out = open_video_writer(output_path, fps, size)
+    for path in segment_paths:
+        cap = cv2.VideoCapture(str(path))
+        for frame in _read_frames(cap):
+            with stage("encode"):
+                out.write(frame)
+        cap.release()
+    out.release()
+
+def process_video_range(model, video_path, start, end=None, segment_path=None, max_per_class=1,
+                        detect_every=1, motion_threshold=None, writer_options=None):
+    """Process frames start..end of a video on their own, e.g. in a worker process
+
+    The capture seeks straight to `start` and the tracker and motion gate
+    start fresh, so ranges can be processed in any order and joined
+    afterwards. With end=None the range runs to the end of the video.
+    Annotated frames are encoded to segment_path unless it is None, with a
+    writer opened from writer_options (see open_video_writer); the segment
+    only appears under that name once it is complete.
+
+    Returns the list of detections for each frame in the range.
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {video_path}")
+    if start:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    out = None
+    if segment_path is not None:
+        partial_path = segment_path.with_name(f"{segment_path.stem}.partial{segment_path.suffix}")
+        size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        out = open_video_writer(partial_path, cap.get(cv2.CAP_PROP_FPS), size, **(writer_options or {}))
+
+    frames = _read_frames(cap)
+    if end is not None:
+        frames = islice(frames, end - start)
+    detect_fn, _, _ = _build_detector(model, max_per_class, detect_every, motion_threshold)
+    range_detections = []
+    try:
+        for frame in frames:
+            detections = detect_fn(frame)
+            range_detections.append(detections)
+            if out is not None:
+                draw_detections(frame, detections)
+                with stage("encode"):
+                    out.write(frame)
+    except Exception:
+        if out is not None:
+            _release_quietly(out)
+            partial_path.unlink(missing_ok=True)
+        raise
+    finally:
+        cap.release()
+
+    if out is not None:
+        out.release()
+        if range_detections:
+            os.replace(partial_path, segment_path)
+        else:
+            partial_path.unlink()
+    return range_detections
+
+def process_video(model, video_path, output_dir, progress_bar=True, pipelined=False, queue_size=8,
+                  max_per_class=1, detect_every=1, motion_threshold=None, render=True, detection_writer=None,
+                  checkpoint=None, segment_seconds=None, writer_options=None):
+    """Process a video file and save the result
+
+    With pipelined=True, decoding and inference run on background threads
+    connected by bounded queues of queue_size frames, while annotation and
+    encoding stay on the calling thread.
+
+    With detect_every > 1, the model only runs on every Nth frame and boxes
+    are carried across the frames in between by a lightweight tracker.
+
+    With motion_threshold set, frames where at most that percentage of the
+    downscaled pixels changed since the last detected frame reuse its
+    detections instead of running the detector.
+
+    With render=False no annotated video is encoded, and per-frame detections
+    are only recorded by the detection_writer. Otherwise writer_options
+    choose and configure the video encoder (see open_video_writer).
+
+    With a RunManifest as checkpoint and segment_seconds set, the video is
+    processed in segments of that many seconds which are recorded in the
+    manifest as they complete and joined at the end. Segments already
+    recorded by an interrupted run are skipped, and the tracker and motion
+    gate restart at every segment so a resumed run gives the same output.
+
+    Returns a dict with the number of frames processed, the elapsed seconds,
+    the average FPS and the time between consecutive output frames, or None
+    if the video could not be processed.
+    """
+    out = None
+    partial_path = None
     try:
         # Start timing
         video_start_time = time.time()
@@ -78,10 +392,18 @@ def process_video(model, video_path, output_dir, progress_bar=True):
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         total_seconds = total_frames / fps
 
-        # Create output video writer
-        output_path = output_dir / f"processed_{video_path.name}"
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
+        if checkpoint is not None and checkpoint.complete:
+            cap.release()
+            tqdm.write(f"\nSkipping video {video_path.name}: already completed")
+            return {'frames': 0, 'seconds': 0.0, 'fps': 0.0, 'frame_times': []}
+
+        # Output video path, written in segments when checkpointing mid-video
+        output_path = output_dir / f"processed_{video_path.name}" if render else None
+        segment_frames = None
+        if checkpoint is not None and segment_seconds:
+            segment_frames = max(1, round(segment_seconds * fps))
+            if render:
+                (output_dir / "segments").mkdir(exist_ok=True)
 
         tqdm.write(f"\nProcessing video: {video_path.name}")
         tqdm.write(f"  - Resolution: {width}x{height}")
@@ -90,78 +412,160 @@ def process_video(model, video_path, output_dir, progress_bar=True):
         tqdm.write(f"  - Duration: {total_seconds:.1f} seconds")
 
         frame_count = 0
+        processed_frames = 0
         last_progress_time = time.time()
         progress_interval = 5  # Show progress every 5 seconds
 
         # Create progress bar
-        pbar = tqdm(total=total_frames, desc="Processing video", unit="frames", position=0, leave=True)
+        pbar = tqdm(total=total_frames, desc="Processing video", unit="frames", position=0, leave=True,
+                    disable=not progress_bar)
+        frame_times = []
+        last_frame_time = time.perf_counter()
 
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+        frames = _read_frames(cap)
+        position = 0
+        segment_paths = []
+        detector_calls = tracked_frames = skipped_frames = 0
+        use_tracker = detect_every > 1
+        use_motion_gate = motion_threshold is not None
 
-            # Perform detection
-            results = model(frame, verbose=False)
-            
-            # Track highest confidence detections for each class
-            class_detections = {}
-            
-            # Process all detections
-            for result in results:
-                boxes = result.boxes
-                for box in boxes:
-                    # Get box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    
-                    # Get class name and confidence
-                    cls = int(box.cls[0].cpu().numpy())
-                    conf = float(box.conf[0].cpu().numpy())
-                    class_name = model.names[cls]
-                    
-                    # Update if this is the highest confidence detection for this class
-                    if class_name not in class_detections or conf > class_detections[class_name]['conf']:
-                        class_detections[class_name] = {
-                            'box': (x1, y1, x2, y2),
-                            'conf': conf
-                        }
-            
-            # Draw only the highest confidence detection for each class
-            for class_name, detection in class_detections.items():
-                draw_detection(frame, detection['box'], class_name, detection['conf'])
-
-            # Write frame to output video
-            out.write(frame)
-            frame_count += 1
-            pbar.update(1)
-
-            # Update progress info every 5 seconds
-            current_time = time.time()
-            if current_time - last_progress_time >= progress_interval:
-                elapsed_seconds = current_time - video_start_time
-                processed_seconds = frame_count / fps
-                remaining_seconds = total_seconds - processed_seconds
-                current_fps = frame_count/elapsed_seconds
-                
-                pbar.set_postfix({
-                    'FPS': f'{current_fps:.1f}',
-                    'ETA': f'{remaining_seconds:.1f}s'
-                })
-                last_progress_time = current_time
+        index = 0
+        while True:
+            segment_path = _segment_path(output_dir, video_path, index) if segment_frames and render else None
+
+            # Skip segments finished by an interrupted run
+            if checkpoint is not None and index in checkpoint.segments:
+                segment_length = checkpoint.segments[index]
+                frame_count += segment_length
+                pbar.update(segment_length)
+                if segment_path is not None and segment_length:
+                    segment_paths.append(segment_path)
+                index += 1
+                if segment_frames is None or segment_length < segment_frames:
+                    break
+                continue
+            if position != frame_count:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_count)
+                position = frame_count
+
+            # Create output video writer
+            if render:
+                partial_path = _segment_path(output_dir, video_path, index, partial=True) if segment_path else output_path
+                out = open_video_writer(partial_path, fps, (width, height), **(writer_options or {}))
+
+            # Decode -> detect stream, either inline or on background threads
+            segment = islice(frames, segment_frames) if segment_frames else frames
+            detect_fn, keyframe_detector, motion_gate = _build_detector(model, max_per_class, detect_every,
+                                                                        motion_threshold)
+            if pipelined:
+                stream = run_pipelined(segment, detect_fn, queue_size)
+            else:
+                stream = ((frame, detect_fn(frame)) for frame in segment)
+
+            segment_length = 0
+            with closing(stream):
+                for frame, detections in stream:
+                    if detection_writer is not None:
+                        detection_writer.write(video_path, detections, frame_index=frame_count,
+                                               timestamp=frame_count / fps if fps else None)
+
+                    if render:
+                        # Draw the selected detections
+                        draw_detections(frame, detections)
+
+                        # Write frame to output video
+                        with stage("encode"):
+                            out.write(frame)
+                    frame_count += 1
+                    segment_length += 1
+                    processed_frames += 1
+                    pbar.update(1)
+
+                    # Record the time spent on each output frame
+                    now = time.perf_counter()
+                    frame_times.append(now - last_frame_time)
+                    last_frame_time = now
+
+                    # Update progress info every 5 seconds
+                    current_time = time.time()
+                    if current_time - last_progress_time >= progress_interval:
+                        elapsed_seconds = current_time - video_start_time
+                        processed_seconds = frame_count / fps
+                        remaining_seconds = total_seconds - processed_seconds
+                        current_fps = processed_frames/elapsed_seconds
+                        
+                        pbar.set_postfix({
+                            'FPS': f'{current_fps:.1f}',
+                            'ETA': f'{remaining_seconds:.1f}s'
+                        })
+                        last_progress_time = current_time
+            position += segment_length
+
+            if keyframe_detector is not None:
+                detector_calls += keyframe_detector.detector_calls
+                tracked_frames += keyframe_detector.frame_count
+            if motion_gate is not None:
+                skipped_frames += motion_gate.skipped
+
+            # Finish the segment before recording it, so a kill never leaves a truncated one behind
+            if out is not None:
+                out.release()
+                out = None
+                if segment_path is not None:
+                    if segment_length:
+                        os.replace(partial_path, segment_path)
+                        segment_paths.append(segment_path)
+                    else:
+                        partial_path.unlink()
+                partial_path = None
+            if checkpoint is not None:
+                checkpoint.mark_segment(index, segment_length, detection_writer)
+            index += 1
+            if segment_frames is None or segment_length < segment_frames:
+                break
 
         # Close progress bar
         pbar.close()
 
         # Release resources
         cap.release()
-        out.release()
+
+        # Join the segments; missing ones mean an earlier run already joined them
+        if segment_paths and all(path.exists() for path in segment_paths):
+            with stage("concat"):
+                _concat_segments(segment_paths, output_path, fps, (width, height))
+        if checkpoint is not None:
+            checkpoint.mark_complete(detection_writer)
+        for path in segment_paths:
+            path.unlink(missing_ok=True)
+        if segment_frames and render and not any((output_dir / "segments").iterdir()):
+            (output_dir / "segments").rmdir()
 
         # Calculate and print processing time
         video_processing_time = time.time() - video_start_time
         tqdm.write(f"\nVideo processing completed:")
         tqdm.write(f"  - Time taken: {video_processing_time:.2f} seconds")
-        tqdm.write(f"  - Average FPS: {frame_count/video_processing_time:.2f}")
-        tqdm.write(f"  - Saved to: {output_path}")
+        tqdm.write(f"  - Average FPS: {processed_frames/video_processing_time:.2f}")
+        if processed_frames < frame_count:
+            tqdm.write(f"  - Resumed after {frame_count - processed_frames} frames from an earlier run")
+        if use_tracker:
+            tqdm.write(f"  - Detector runs: {detector_calls} of {tracked_frames} frames")
+        if use_motion_gate:
+            tqdm.write(f"  - Static frames skipped: {skipped_frames} of {processed_frames}")
+        if output_path is not None:
+            tqdm.write(f"  - Saved to: {output_path}")
+
+        return {
+            'frames': processed_frames,
+            'seconds': video_processing_time,
+            'fps': processed_frames / video_processing_time,
+            'frame_times': frame_times
+        }
         
     except Exception as e:
+        # Do not leave a half-written video behind
+        if out is not None:
+            _release_quietly(out)
+        if partial_path is not None:
+            partial_path.unlink(missing_ok=True)
         tqdm.write(f"Error processing video {video_path}: {str(e)}") 
\ No newline at end of file
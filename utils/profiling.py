@@ -0,0 +1,165 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import numpy as np
+import torch
+
+class StageTimings:
+    """Thread-safe per-stage timing with a rolling window of recent durations
+
+    Counts and totals cover the whole run, while percentiles are computed
+    over the last `window` durations of each stage so long runs keep a
+    bounded memory footprint.
+    """
+
+    def __init__(self, window=2000):
+        self.window = window
+        self.enabled = True
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget all recorded durations"""
+        with self._lock:
+            self._durations = {}
+            self._counts = {}
+            self._totals = {}
+
+    def record(self, name, seconds):
+        """Record one duration for a stage"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if name not in self._durations:
+                self._durations[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+                self._totals[name] = 0.0
+            self._durations[name].append(seconds)
+            self._counts[name] += 1
+            self._totals[name] += seconds
+
+    def drain(self):
+        """Return the recorded state as {stage: (durations, count, total)} and reset it"""
+        with self._lock:
+            state = {name: (list(durations), self._counts[name], self._totals[name])
+                     for name, durations in self._durations.items()}
+            self._durations = {}
+            self._counts = {}
+            self._totals = {}
+        return state
+
+    def merge(self, state):
+        """Add state drained from another StageTimings, e.g. in a worker process"""
+        with self._lock:
+            for name, (durations, count, total) in state.items():
+                if name not in self._durations:
+                    self._durations[name] = deque(maxlen=self.window)
+                    self._counts[name] = 0
+                    self._totals[name] = 0.0
+                self._durations[name].extend(durations)
+                self._counts[name] += count
+                self._totals[name] += total
+
+    @contextmanager
+    def stage(self, name):
+        """Time the body of a with-block as one occurrence of a stage"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self):
+        """Return {stage: {count, total_s, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        with self._lock:
+            snapshot = {name: (list(durations), self._counts[name], self._totals[name])
+                        for name, durations in self._durations.items()}
+
+        summary = {}
+        for name, (durations, count, total) in snapshot.items():
+            values = np.asarray(durations) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[name] = {
+                'count': count,
+                'total_s': round(total, 4),
+                'mean_ms': round(total / count * 1000, 3),
+                'p50_ms': round(float(p50), 3),
+                'p95_ms': round(float(p95), 3),
+                'p99_ms': round(float(p99), 3),
+                'max_ms': round(float(values.max()), 3)
+            }
+        return summary
+
+    def format_summary(self):
+        """Format the summary as a table, slowest stages first"""
+        summary = self.summary()
+        if not summary:
+            return "No stage timings recorded"
+        lines = [f"{'Stage':<22}{'Count':>8}{'Total s':>10}{'Mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for name, stats in sorted(summary.items(), key=lambda item: -item[1]['total_s']):
+            lines.append(f"{name:<22}{stats['count']:>8}{stats['total_s']:>10.2f}{stats['mean_ms']:>10.2f}"
+                         f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+        return "\n".join(lines)
+
+# Process-wide timings shared by the processing, visualization and GUI code
+timings = StageTimings()
+
+def stage(name):
+    """Time a block as a stage in the shared timings"""
+    return timings.stage(name)
+
+def record_model_speed(results):
+    """Record the preprocess/inference/postprocess split reported by ultralytics results
+
+    Ultralytics reports the per-image speed of a call in milliseconds, so a
+    batched call is recorded once per image.
+    """
+    for result in results:
+        speed = getattr(result, 'speed', None) or {}
+        for name in ('preprocess', 'inference', 'postprocess'):
+            if speed.get(name) is not None:
+                timings.record(f"model.{name}", speed[name] / 1000)
+
+@contextmanager
+def profile_run(output_dir, mode="cprofile"):
+    """Profile the body of a with-block and write the trace to the output directory
+
+    "cprofile" writes profile.prof (open with snakeviz or pstats) and prints
+    the top functions by cumulative time. Only the calling thread is
+    profiled, so pipelined stages show up as time spent waiting on queues.
+    "torch" writes a Chrome trace of operator timings to torch_trace.json.
+    """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            trace_path = output_dir / "profile.prof"
+            profiler.dump_stats(str(trace_path))
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(20)
+            print(stream.getvalue())
+            print(f"cProfile trace saved to: {trace_path}")
+
+    elif mode == "torch":
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        with torch.profiler.profile(activities=activities) as profiler:
+            yield
+        trace_path = output_dir / "torch_trace.json"
+        profiler.export_chrome_trace(str(trace_path))
+        print(profiler.key_averages().table(sort_by="self_cpu_time_total", row_limit=20))
+        print(f"Torch profiler trace saved to: {trace_path}")
+
+    else:
+        raise ValueError(f"Unknown profiler: {mode}")
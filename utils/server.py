@@ -0,0 +1,191 @@
+import base64
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import cv2
+import numpy as np
+from .detection_writer import detection_to_json
+from .postprocess import select_detections
+from .profiling import StageTimings, record_model_speed
+from .visualization import draw_detections
+
+class _Request:
+    """One image waiting for a batched model call"""
+
+    def __init__(self, image, max_per_class):
+        self.image = image
+        self.max_per_class = max_per_class
+        self.arrived = time.perf_counter()
+        self.done = threading.Event()
+        self.detections = None
+        self.batch_size = None
+        self.error = None
+
+class MicroBatcher:
+    """Gather concurrent requests into batched model calls
+
+    A single thread owns the model. It waits for the first request, then keeps
+    collecting requests until max_batch_size images are queued or max_wait_ms
+    has passed since the first one arrived, and runs them as one model call.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=10, latency=None):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.latency = latency if latency is not None else StageTimings()
+        self.batches = 0
+        self.images = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def detect(self, image, max_per_class=1):
+        """Queue an image and block until its detections are ready"""
+        request = _Request(image, max_per_class)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.detections, request.batch_size
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the deadline passes"""
+        batch = [self._queue.get()]
+        deadline = batch[0].arrived + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Requests that queued up during the previous model call join without waiting
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            start = time.perf_counter()
+            for request in batch:
+                self.latency.record("queue_wait", start - request.arrived)
+            try:
+                results = self.model([request.image for request in batch], verbose=False)
+                record_model_speed(results)
+                for request, result in zip(batch, results):
+                    request.detections = select_detections(result, self.model.names, request.max_per_class)
+                    request.batch_size = len(batch)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            self.latency.record("batch_inference", time.perf_counter() - start)
+            self.batches += 1
+            self.images += len(batch)
+            for request in batch:
+                request.done.set()
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP endpoints of the detection server
+
+    POST /detect   body: encoded image bytes (JPEG, PNG, ...)
+                   query: max_per_class=N, annotated=1 to include a base64 JPEG
+    GET  /health   model name and status
+    GET  /stats    request latency percentiles and batching statistics
+    """
+
+    server_version = "YOLODetect/1.0"
+
+    def log_message(self, format, *args):
+        pass  # Per-request logging would dominate the console under load
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, {'status': 'ok', 'model': self.server.model_name})
+        elif path == "/stats":
+            batcher = self.server.batcher
+            self._send_json(200, {
+                'batches': batcher.batches,
+                'images': batcher.images,
+                'mean_batch_size': round(batcher.images / batcher.batches, 3) if batcher.batches else None,
+                'latency': batcher.latency.summary()
+            })
+        else:
+            self._send_json(404, {'error': f"Unknown path: {path}"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        if url.path != "/detect":
+            self._send_json(404, {'error': f"Unknown path: {url.path}"})
+            return
+
+        query = parse_qs(url.query)
+        try:
+            max_per_class = int(query.get('max_per_class', [self.server.max_per_class])[0])
+        except ValueError:
+            self._send_json(400, {'error': "max_per_class must be an integer"})
+            return
+        annotated = query.get('annotated', ['0'])[0].lower() in ("1", "true", "yes")
+
+        length = int(self.headers.get("Content-Length", 0))
+        data = np.frombuffer(self.rfile.read(length), dtype=np.uint8)
+        image = cv2.imdecode(data, cv2.IMREAD_COLOR) if data.size else None
+        if image is None:
+            self._send_json(400, {'error': "Request body is not a readable image"})
+            return
+
+        try:
+            detections, batch_size = self.server.batcher.detect(image, max_per_class)
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+
+        response = {
+            'detections': [detection_to_json(detection) for detection in detections],
+            'width': image.shape[1],
+            'height': image.shape[0],
+            'batch_size': batch_size
+        }
+        if annotated:
+            draw_detections(image, detections)
+            _, encoded = cv2.imencode(".jpg", image)
+            response['image'] = base64.b64encode(encoded.tobytes()).decode()
+
+        elapsed = time.perf_counter() - start
+        self.server.batcher.latency.record("request", elapsed)
+        response['latency_ms'] = round(elapsed * 1000, 3)
+        self._send_json(200, response)
+
+def serve(model, model_name, host="127.0.0.1", port=8000, max_batch_size=8, max_wait_ms=10, max_per_class=1):
+    """Serve detections over HTTP with a warm model until interrupted"""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.batcher = MicroBatcher(model, max_batch_size, max_wait_ms)
+    server.model_name = model_name
+    server.max_per_class = max_per_class
+
+    print(f"Serving {model_name} on http://{host}:{server.server_address[1]} "
+          f"(batches of up to {max_batch_size}, {max_wait_ms} ms deadline)")
+    print("  - POST /detect with image bytes (?annotated=1 to include the annotated image)")
+    print("  - GET /stats for request latency percentiles")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return server.batcher.latency.summary()
@@ -0,0 +1,87 @@
+import numpy as np
+import torch
+import torchvision
+from .postprocess import extract_boxes
+from .profiling import record_model_speed, stage
+
+def tile_origins(length, tile_size, overlap):
+    """Start offsets of tiles covering [0, length), with the last tile aligned to the end"""
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size)
+    return origins
+
+def tile_grid(width, height, tile_size, overlap=0.2):
+    """Return (x1, y1, x2, y2) windows that cover an image with overlapping tiles"""
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in tile_origins(height, tile_size, overlap)
+            for x in tile_origins(width, tile_size, overlap)]
+
+def cut_at_tile_edge(xyxy, window, width, height, margin=2):
+    """Mask of tile boxes that touch an edge of the tile lying inside the image
+
+    Such boxes are usually fragments of an object cut off by the tile, which
+    a neighbouring tile or the full-image pass sees whole.
+    """
+    x1, y1, x2, y2 = window
+    return (((xyxy[:, 0] <= margin) & (x1 > 0)) |
+            ((xyxy[:, 1] <= margin) & (y1 > 0)) |
+            ((xyxy[:, 2] >= x2 - x1 - margin) & (x2 < width)) |
+            ((xyxy[:, 3] >= y2 - y1 - margin) & (y2 < height)))
+
+def merge_boxes(xyxy, cls, conf, iou_threshold=0.5):
+    """Class-aware NMS over boxes gathered from several tiles
+
+    Returns the indices of the boxes to keep, highest confidence first.
+    """
+    if len(xyxy) == 0:
+        return np.zeros(0, dtype=np.int64)
+    keep = torchvision.ops.batched_nms(torch.from_numpy(np.ascontiguousarray(xyxy, dtype=np.float32)),
+                                       torch.from_numpy(np.ascontiguousarray(conf, dtype=np.float32)),
+                                       torch.from_numpy(cls), iou_threshold)
+    return keep.numpy()
+
+def detect_tiled(model, img, tile_size=640, overlap=0.2, batch_size=8, iou_threshold=0.5, include_full=True):
+    """Detect objects in a large image by running the model on overlapping tiles
+
+    Tiles are sent through the model batch_size at a time at their native
+    resolution, so small objects are not lost to downscaling. Their boxes are
+    shifted back to full-image coordinates and duplicates from overlapping
+    tiles are merged with a class-aware NMS. With include_full, the whole
+    downscaled image is also run once so objects larger than a tile are still
+    found in one piece, and tile boxes cut off at an inner tile edge are
+    dropped rather than left as fragments next to the whole object, which
+    NMS would not remove.
+
+    Returns (xyxy, cls, conf) arrays like extract_boxes.
+    """
+    height, width = img.shape[:2]
+    windows = tile_grid(width, height, tile_size, overlap)
+    drop_cut = include_full and len(windows) > 1
+    if drop_cut:
+        windows.append((0, 0, width, height))
+
+    all_xyxy, all_cls, all_conf = [], [], []
+    for i in range(0, len(windows), batch_size):
+        batch = windows[i:i + batch_size]
+        with stage("inference"):
+            results = model([img[y1:y2, x1:x2] for x1, y1, x2, y2 in batch], verbose=False)
+        record_model_speed(results)
+        for window, result in zip(batch, results):
+            xyxy, cls, conf = extract_boxes(result)
+            if drop_cut and window != (0, 0, width, height):
+                whole = ~cut_at_tile_edge(xyxy, window, width, height)
+                xyxy, cls, conf = xyxy[whole], cls[whole], conf[whole]
+            x1, y1 = window[:2]
+            all_xyxy.append(xyxy + np.array([x1, y1, x1, y1], dtype=xyxy.dtype))
+            all_cls.append(cls)
+            all_conf.append(conf)
+
+    with stage("merge"):
+        xyxy = np.concatenate(all_xyxy)
+        cls = np.concatenate(all_cls)
+        conf = np.concatenate(all_conf)
+        keep = merge_boxes(xyxy, cls, conf, iou_threshold)
+    return xyxy[keep], cls[keep], conf[keep]
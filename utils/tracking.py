@@ -0,0 +1,129 @@
+import numpy as np
+from .motion import thumbnail
+from .postprocess import box_iou, greedy_matches
+from .profiling import stage
+
+def _to_cxcywh(boxes):
+    """Convert (N, 4) xyxy boxes to center/size form"""
+    return np.concatenate([(boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]], axis=1)
+
+def _to_xyxy(states):
+    """Convert (N, 4) center/size states back to xyxy boxes"""
+    half = np.clip(states[:, 2:], 0, None) / 2
+    return np.concatenate([states[:, :2] - half, states[:, :2] + half], axis=1)
+
+class BoxTracker:
+    """Constant-velocity tracker that carries detections between detector runs
+
+    Each track keeps its box as (cx, cy, w, h) and a per-frame velocity. When
+    new detections arrive they are matched to existing tracks of the same class
+    by IoU, and the velocity is updated with an alpha-beta style filter. In
+    between detections boxes are extrapolated and their confidence decays.
+    Tracks are dropped once their confidence has decayed below min_conf_ratio
+    of what the detector reported, so low and high confidence boxes are
+    carried for the same number of frames.
+    """
+
+    def __init__(self, iou_threshold=0.3, velocity_smoothing=0.5, conf_decay=0.95, min_conf_ratio=0.5):
+        self.iou_threshold = iou_threshold
+        self.velocity_smoothing = velocity_smoothing
+        self.conf_decay = conf_decay
+        self.min_conf_ratio = min_conf_ratio
+        self.detections = []
+        self.states = np.zeros((0, 4), dtype=np.float32)
+        self.velocities = np.zeros((0, 4), dtype=np.float32)
+        self.age = 0
+
+    def update(self, detections, frames_elapsed=1):
+        """Replace the tracks with fresh detections taken frames_elapsed frames after the last ones"""
+        if detections:
+            boxes = np.array([detection['box'] for detection in detections], dtype=np.float32)
+        else:
+            boxes = np.zeros((0, 4), dtype=np.float32)
+        states = _to_cxcywh(boxes)
+        velocities = np.zeros_like(states)
+
+        if len(self.detections) and len(detections) and frames_elapsed > 0:
+            # Match against where the old tracks are predicted to be now
+            predicted = self.states + self.velocities * frames_elapsed
+            iou = box_iou(boxes, _to_xyxy(predicted))
+
+            # Only allow matches between boxes of the same class
+            new_classes = np.array([detection['class_id'] for detection in detections])
+            old_classes = np.array([detection['class_id'] for detection in self.detections])
+            iou[new_classes[:, None] != old_classes[None, :]] = 0
+
+            # Greedy matching from the highest IoU down
+            for new_index, old_index in greedy_matches(iou, self.iou_threshold):
+                measured = (states[new_index] - self.states[old_index]) / frames_elapsed
+                velocities[new_index] = (self.velocity_smoothing * measured +
+                                         (1 - self.velocity_smoothing) * self.velocities[old_index])
+
+        self.detections = list(detections)
+        self.states = states
+        self.velocities = velocities
+        self.age = 0
+
+    def predict(self, frame_shape=None):
+        """Advance the tracks by one frame and return the propagated detections
+
+        Tracks whose confidence has decayed below min_conf_ratio of their
+        detected confidence are dropped.
+        """
+        self.age += 1
+        decay = self.conf_decay ** self.age
+        if not self.detections or decay < self.min_conf_ratio:
+            return []
+
+        boxes = _to_xyxy(self.states + self.velocities * self.age)
+        if frame_shape is not None:
+            height, width = frame_shape[:2]
+            boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+            boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+
+        return [{**detection, 'box': tuple(box), 'conf': detection['conf'] * decay}
+                for detection, box in zip(self.detections, boxes.tolist())]
+
+class KeyframeDetector:
+    """Run a frame detector every N frames and track boxes across the frames in between
+
+    A fresh detection is forced before the stride is reached when the scene
+    changes, measured as the mean absolute difference of downscaled
+    grayscale frames against the last keyframe. Tracked boxes that decay too
+    far are dropped by the tracker until the next keyframe finds them again.
+    """
+
+    def __init__(self, detect_fn, detect_every, scene_change_threshold=30.0, tracker=None):
+        self.detect_fn = detect_fn
+        self.detect_every = detect_every
+        self.scene_change_threshold = scene_change_threshold
+        self.tracker = tracker or BoxTracker()
+        self.keyframe_thumbnail = None
+        self.frames_since_keyframe = 0
+        self.frame_count = 0
+        self.detector_calls = 0
+
+    def _needs_detection(self, small):
+        """Check whether the stride or a scene change calls for a fresh detection"""
+        if self.keyframe_thumbnail is None or self.frames_since_keyframe + 1 >= self.detect_every:
+            return True
+        scene_change = float(np.mean(np.abs(small - self.keyframe_thumbnail)))
+        return scene_change > self.scene_change_threshold
+
+    def __call__(self, frame):
+        self.frame_count += 1
+        small = thumbnail(frame)
+
+        if not self._needs_detection(small):
+            with stage("track"):
+                propagated = self.tracker.predict(frame.shape)
+            self.frames_since_keyframe += 1
+            return propagated
+
+        # Keyframe: run the real detector and restart the tracks from its output
+        detections = self.detect_fn(frame)
+        self.detector_calls += 1
+        self.tracker.update(detections, self.frames_since_keyframe + 1)
+        self.keyframe_thumbnail = small
+        self.frames_since_keyframe = 0
+        return detections
@@ -0,0 +1,128 @@
+import queue
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+import cv2
+from tqdm import tqdm
+
+WRITER_BACKENDS = ("opencv", "ffmpeg")
+
+# WebM only holds VP8, VP9 and AV1 video; the other containers take any codec used here
+_WEBM_CODECS = ("libvpx", "libvpx-vp9", "libaom-av1", "libsvtav1", "librav1e")
+
+class OpenCVWriter:
+    """Encode frames with OpenCV's built-in MPEG-4 Part 2 (mp4v) encoder"""
+
+    def __init__(self, path, fps, size):
+        self._writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+    def write(self, frame):
+        self._writer.write(frame)
+
+    def release(self):
+        self._writer.release()
+
+class FFmpegWriter:
+    """Encode frames by piping raw BGR pixels into a local ffmpeg process
+
+    codec, preset and crf are passed to ffmpeg as -c:v, -preset and -crf, and
+    threads limits the encoder's threads (0 lets ffmpeg decide). Output is
+    yuv420p so it plays back everywhere, padded by a pixel when the width
+    or height is odd since yuv420p needs even sizes, and MP4 files get
+    their index at the front for streaming.
+    """
+
+    def __init__(self, path, fps, size, codec="libx264", preset="veryfast", crf=23, threads=0, ffmpeg=None):
+        command = [
+            ffmpeg or shutil.which("ffmpeg"), "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{size[0]}x{size[1]}", "-r", f"{fps or 30}",
+            "-i", "-", "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", codec, "-preset", preset, "-crf", str(crf), "-threads", str(threads),
+            "-pix_fmt", "yuv420p", "-movflags", "+faststart", str(path)
+        ]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame):
+        try:
+            self._process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            self.release()  # Raises ffmpeg's own error
+            raise RuntimeError("ffmpeg exited before all frames were written")
+
+    def release(self):
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass  # ffmpeg exited early; its error is read below
+        error = self._process.stderr.read().decode(errors="replace").strip()
+        if self._process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {error}")
+
+class AsyncWriter:
+    """Encode frames on a background thread so the caller never waits for the encoder
+
+    Frames are handed over through a bounded queue of queue_size frames, so
+    the caller only blocks if the encoder falls that far behind. Frames must
+    not be modified after they are written. An encoder error is raised from
+    the next write or from release.
+    """
+
+    def __init__(self, writer, queue_size=32):
+        self.writer = writer
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            if self._error is not None:
+                continue  # Drain the queue so the caller does not block
+            try:
+                self.writer.write(frame)
+            except Exception as e:
+                self._error = e
+
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(frame)
+
+    def release(self):
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            self.writer.release()
+        finally:
+            if self._error is not None:
+                raise self._error
+
+def open_video_writer(path, fps, size, backend="opencv", async_write=True, queue_size=32, **ffmpeg_options):
+    """Open a video writer for annotated frames
+
+    backend="ffmpeg" pipes frames to a local ffmpeg process, configured by
+    ffmpeg_options (codec, preset, crf, threads), and falls back to OpenCV's
+    mp4v encoder with a warning when ffmpeg is not installed or the codec
+    cannot be stored in the output's container (e.g. H.264 in WebM). With
+    async_write=True, encoding runs on a background thread.
+
+    Every writer has write(frame) and release().
+    """
+    if backend not in WRITER_BACKENDS:
+        raise ValueError(f"Unsupported video writer: {backend}")
+    ffmpeg = shutil.which("ffmpeg") if backend == "ffmpeg" else None
+    if backend == "ffmpeg" and ffmpeg is None:
+        tqdm.write("Warning: ffmpeg not found, falling back to the OpenCV video writer")
+    codec = ffmpeg_options.get('codec', "libx264")
+    if ffmpeg is not None and Path(path).suffix.lower() == ".webm" and codec not in _WEBM_CODECS:
+        tqdm.write(f"Warning: {codec} cannot be written to WebM, falling back to the OpenCV video writer")
+        ffmpeg = None
+    if ffmpeg is not None:
+        writer = FFmpegWriter(path, fps, size, ffmpeg=ffmpeg, **ffmpeg_options)
+    else:
+        writer = OpenCVWriter(path, fps, size)
+    return AsyncWriter(writer, queue_size) if async_write else writer
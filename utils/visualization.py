@@ -1,4 +1,5 @@
 import cv2
+from .profiling import stage
 
 def draw_detection(img, box, class_name, conf):
     """Draw bounding box and label on image"""
@@ -28,4 +29,10 @@ def draw_detection(img, box, class_name, conf):
                 (0, 255, 0), -1)
     
     # Draw text
-    cv2.putText(img, label, (text_x, text_y), font, font_scale, (0, 0, 0), thickness) 
\ No newline at end of file
+    cv2.putText(img, label, (text_x, text_y), font, font_scale, (0, 0, 0), thickness)
+
+def draw_detections(img, detections):
+    """Draw every detection in a list of detection dicts on an image"""
+    with stage("draw"):
+        for detection in detections:
+            draw_detection(img, detection['box'], detection['class_name'], detection['conf'])
@@ -0,0 +1,118 @@
+import json
+import os
+import time
+from pathlib import Path
+from tqdm import tqdm
+from .file_utils import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS
+from .processing import process_image, process_video
+from .profiling import timings
+
+class WatchState:
+    """Files already processed by the watcher, persisted as a small JSON file
+
+    Each entry stores the size and modification time the file had when it was
+    processed, so a restart skips unchanged files and a file that is
+    overwritten later is processed again.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.files = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                self.files = json.load(f)
+
+    def is_done(self, name, signature):
+        """Check whether a file was processed with this size and modification time"""
+        entry = self.files.get(name)
+        return entry is not None and (entry['size'], entry['mtime_ns']) == signature
+
+    def mark_done(self, name, signature, ok):
+        """Record a processed file and write the state atomically"""
+        self.files[name] = {'size': signature[0], 'mtime_ns': signature[1], 'ok': ok,
+                            'processed_at': time.time()}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.files, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+def _scan(folder):
+    """Return {name: (size, mtime_ns)} for the images and videos in a folder"""
+    files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            suffix = os.path.splitext(entry.name)[1].lower()
+            if suffix not in IMAGE_EXTENSIONS + VIDEO_EXTENSIONS or not entry.is_file():
+                continue
+            stat = entry.stat()
+            files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+def watch_folder(model, folder, output_dir, state_path=None, interval=1.0, settle_seconds=1.0,
+                 cache=None, video_options=None, image_options=None, **options):
+    """Process images and videos as they arrive in a folder until interrupted
+
+    The folder is polled every `interval` seconds. A new or modified file is
+    processed once its size and modification time have stayed the same for
+    `settle_seconds`, so files that are still being copied in are not read
+    half-written. Processed files are recorded in the state file (default:
+    .detect_watch_state.json in the watched folder), and files that were
+    already processed with the same size and modification time are skipped,
+    including after a restart. Files that fail to process are recorded too
+    and are only retried once they change.
+
+    options are passed to every process_image/process_video call,
+    image_options only to process_image and video_options only to
+    process_video.
+    """
+    folder = Path(folder)
+    state = WatchState(state_path or folder / ".detect_watch_state.json")
+    video_options = video_options or {}
+    image_options = image_options or {}
+
+    # name -> (signature, time it was first seen with that signature, time it was first seen at all)
+    pending = {}
+    processed = 0
+
+    print(f"Watching {folder} for new images and videos (Ctrl+C to stop)...")
+    try:
+        while True:
+            now = time.monotonic()
+            files = _scan(folder)
+            for name in pending.keys() - files.keys():
+                del pending[name]  # Removed before it settled
+
+            for name, signature in files.items():
+                if state.is_done(name, signature):
+                    pending.pop(name, None)
+                    continue
+
+                seen = pending.get(name)
+                if seen is None:
+                    pending[name] = (signature, now, now)
+                    continue
+                if seen[0] != signature:
+                    # Still being written; restart the settle timer
+                    pending[name] = (signature, now, seen[2])
+                    continue
+                if now - seen[1] < settle_seconds or signature[0] == 0:
+                    continue
+
+                path = folder / name
+                if path.suffix.lower() in VIDEO_EXTENSIONS:
+                    result = process_video(model, path, output_dir, progress_bar=False,
+                                           **video_options, **options)
+                else:
+                    result = process_image(model, path, output_dir, cache=cache, **image_options, **options)
+
+                latency = time.monotonic() - seen[2]
+                timings.record("arrival_to_result", latency)
+                state.mark_done(name, signature, ok=result is not None)
+                del pending[name]
+                processed += 1
+                tqdm.write(f"  - {name} ready {latency:.2f} seconds after it arrived")
+
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print(f"\nStopped watching {folder} after processing {processed} files")
+    return processed